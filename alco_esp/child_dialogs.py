@@ -1,12 +1,16 @@
 import json
 import os
 import sys
-from datetime import timedelta, datetime
+import time
+from datetime import datetime, timezone
 
-from PyQt5.QtCore import QUrl, Qt
+import matplotlib.dates as mdates
+from dateutil import tz
+
+from PyQt5.QtCore import QUrl, Qt, QAbstractTableModel, QModelIndex
 from PyQt5.QtGui import QDesktopServices
 from PyQt5.QtWidgets import (
-    QMessageBox, QDialog, QVBoxLayout, QPushButton, QTableWidget, QHeaderView, QTableWidgetItem, QLabel)
+    QMessageBox, QDialog, QVBoxLayout, QPushButton, QTableView, QHeaderView, QLabel)
 
 from matplotlib.backends.backend_qt import NavigationToolbar2QT as NavigationToolbar
 
@@ -15,6 +19,32 @@ from alco_esp.constants import APP_ROOT_DIR, STYLE_ALARM_TRIGGERED
 
 SECRETS_FILE_PATH = os.path.join(APP_ROOT_DIR, "secrets.json")
 
+# The chart shows local time, while timestamps are stored as POSIX seconds
+LOCAL_TZ = tz.tzlocal()
+SECONDS_PER_DAY = 24 * 3600
+EPOCH_DATENUM = mdates.date2num(datetime.fromtimestamp(0, timezone.utc))
+
+
+def epoch_to_datenum(epoch_seconds):
+    """Converts POSIX timestamp(s) in seconds (a number or a numpy array) to Matplotlib date numbers."""
+    return EPOCH_DATENUM + epoch_seconds / SECONDS_PER_DAY
+
+
+def datenum_to_epoch(datenum):
+    """Converts Matplotlib date number(s) to POSIX timestamp(s) in seconds, inverse of epoch_to_datenum."""
+    return (datenum - EPOCH_DATENUM) * SECONDS_PER_DAY
+
+
+def series_time_range(series_dict):
+    """
+    Returns (first, last) timestamp over all the time series buffers, or None if they are all empty.
+    Timestamps are appended in order, so only the ends of each buffer are looked at.
+    """
+    ts_views = [series.view()[0] for series in series_dict.values() if len(series)]
+    if not ts_views:
+        return None
+    return min(ts_view[0] for ts_view in ts_views), max(ts_view[-1] for ts_view in ts_views)
+
 
 def load_secrets_with_gui_feedback():
     """
@@ -36,9 +66,9 @@ def load_secrets_with_gui_feedback():
         with open(SECRETS_FILE_PATH, 'r', encoding='utf-8') as f:
             secrets = json.load(f)
 
-        required_keys = ["broker", "port", "username", "password"]
-        if not all(key in secrets for key in required_keys):
-            missing_keys = [key for key in required_keys if key not in secrets]
+        required_keys = ("broker", "port", "username", "password")
+        missing_keys = [key for key in required_keys if key not in secrets]
+        if missing_keys:
             msg = f"В файле секретов {SECRETS_FILE_PATH} отсутствуют необходимые ключи: {', '.join(missing_keys)}"
             logger.critical(msg)
             QMessageBox.critical(None, "Ошибка конфигурации", msg)
@@ -60,10 +90,10 @@ def load_secrets_with_gui_feedback():
 
 
 class CustomNavigationToolbar(NavigationToolbar):
-    def __init__(self, canvas, parent, timestamps_ref):
+    def __init__(self, canvas, parent, series_ref):
         super().__init__(canvas, parent)
         self.main_window = parent
-        self.timestamps_ref = timestamps_ref
+        self.series_ref = series_ref # Time series buffers of the main window, (timestamps, values) rows
 
     def home(self, *args):
         """Overrides the default home button behavior to zoom to full data range
@@ -71,21 +101,20 @@ class CustomNavigationToolbar(NavigationToolbar):
         logger.debug("Custom 'Home' button pressed. Resetting view to full data range and enabling autoscroll.")
         ax = self.canvas.figure.axes[0]
 
-        all_times = [t for topic_times in self.timestamps_ref.values() for t in topic_times if topic_times]
-        if all_times:
-            min_time = min(all_times)
-            max_time = max(all_times)
+        data_range = series_time_range(self.series_ref)
+        if data_range:
+            min_time, max_time = data_range
             if min_time == max_time:
-                max_time = max_time + timedelta(seconds=10)
+                max_time = max_time + 10
             else:
                 time_range = max_time - min_time
                 max_time = max_time + time_range * 0.05
                 min_time = min_time - time_range * 0.01
-            ax.set_xlim(min_time, max_time)
+            ax.set_xlim(epoch_to_datenum(min_time), epoch_to_datenum(max_time))
             logger.debug(f"Home button: setting xlim to ({min_time}, {max_time})")
         else:
-            now = datetime.now()
-            ax.set_xlim(now - timedelta(seconds=60), now)
+            now = time.time()
+            ax.set_xlim(epoch_to_datenum(now - 60), epoch_to_datenum(now))
 
         # Reset Y-axis to default view
         ax.set_ylim(self.main_window.settings["chart_y_min"], self.main_window.settings["chart_y_max"])
@@ -99,6 +128,71 @@ class CustomNavigationToolbar(NavigationToolbar):
         self.canvas.draw()
 
 
+class DeviceDataModel(QAbstractTableModel):
+    """
+    Table model of the latest device values, one (parameter, value) row per topic.
+    Rows are only rebuilt when the set of topics changes, otherwise just the changed values are reported to the view.
+    """
+    HEADERS = ("Параметр", "Значение")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = [] # [key, value] lists in display order
+        self._keys = set()
+        self._sort_column = 0
+        self._sort_order = Qt.AscendingOrder
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole:
+            return self._rows[index.row()][index.column()]
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """Called by the view when the user clicks a column header."""
+        self._sort_column, self._sort_order = column, order
+        self.layoutAboutToBeChanged.emit()
+        self._sort_rows()
+        self.layoutChanged.emit()
+
+    def _sort_rows(self):
+        self._rows.sort(key=lambda row: row[self._sort_column], reverse=self._sort_order == Qt.DescendingOrder)
+
+    def update_data(self, data_dict):
+        if data_dict.keys() != self._keys:
+            self.beginResetModel()
+            self._rows = [[str(key), str(value)] for key, value in data_dict.items()]
+            self._keys = set(data_dict)
+            self._sort_rows()
+            self.endResetModel()
+            return
+
+        first_changed = last_changed = None
+        for i, row in enumerate(self._rows):
+            value = str(data_dict[row[0]])
+            if row[1] != value:
+                row[1] = value
+                if first_changed is None:
+                    first_changed = i
+                last_changed = i
+        if first_changed is None:
+            return
+        if self._sort_column == 1: # The order depends on the values
+            self.sort(self._sort_column, self._sort_order)
+        else:
+            self.dataChanged.emit(self.index(first_changed, 1), self.index(last_changed, 1), [Qt.DisplayRole])
+
+
 class AllDataViewerDialog(QDialog):
     def __init__(self, data_dict, parent=None):
         super().__init__(parent)
@@ -111,12 +205,15 @@ class AllDataViewerDialog(QDialog):
         self.log_button.clicked.connect(self.open_log_folder)
         layout.addWidget(self.log_button)
 
-        self.table = QTableWidget()
-        self.table.setColumnCount(2)
-        self.table.setHorizontalHeaderLabels(["Параметр", "Значение"])
+        self.model = DeviceDataModel(self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
         self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
         self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeToContents)
+        # Single-line values: fixed row heights instead of measuring the rows on every update
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         self.table.setSortingEnabled(True)
+        self.table.sortByColumn(0, Qt.AscendingOrder)
 
         layout.addWidget(self.table)
         self.update_data(data_dict)
@@ -131,18 +228,7 @@ class AllDataViewerDialog(QDialog):
             QMessageBox.warning(self, "Папка не найдена", f"Папка с журналами не найдена:\n{log_dir}")
 
     def update_data(self, data_dict):
-        self.table.setSortingEnabled(False)
-        self.table.setRowCount(len(data_dict))
-
-        # Using a list from items() is sufficient
-        sorted_items = sorted(data_dict.items())
-
-        for row, (key, value) in enumerate(sorted_items):
-            self.table.setItem(row, 0, QTableWidgetItem(str(key)))
-            self.table.setItem(row, 1, QTableWidgetItem(str(value)))
-
-        self.table.resizeRowsToContents()
-        self.table.setSortingEnabled(True)
+        self.model.update_data(data_dict)
 
 
 class AlarmNotificationDialog(QDialog):
@@ -155,6 +241,7 @@ class AlarmNotificationDialog(QDialog):
         layout = QVBoxLayout(self)
 
         self.message_label = QLabel(message)
+        self.message_label.setTextFormat(Qt.PlainText) # Messages are never rich text, skip the auto-detection
         self.message_label.setWordWrap(True)
         self.message_label.setStyleSheet(STYLE_ALARM_TRIGGERED)
         self.message_label.setAlignment(Qt.AlignCenter)
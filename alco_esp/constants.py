@@ -38,6 +38,9 @@ TOPICS_OF_MAIN_INTEREST = CHART_TEMPERATURE_TOPICS + ["power", "press_a", "flag_
 
 CSV_DATA_TOPIC_ORDER = CHART_TEMPERATURE_TOPICS + ["power", "press_a", "flag_otb"]
 
+# Column of each topic in the CSV data log (after the time column)
+CSV_DATA_TOPIC_INDEX = {topic: i for i, topic in enumerate(CSV_DATA_TOPIC_ORDER)}
+
 CSV_DATA_HEADERS = {
     "term_d": "T дефлегматор",
     "term_c": "T царга",
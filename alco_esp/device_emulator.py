@@ -1,16 +1,15 @@
+import functools
 import paho.mqtt.client as mqtt
 import time
 import random
-from datetime import datetime
 import json
 import os
 import sys
 
-from alco_esp.constants import WorkState, WORK_STATE_NAMES
+from alco_esp.constants import APP_ROOT_DIR, WorkState, WORK_STATE_NAMES
 
 
 # --- Secrets Management ---
-APP_ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
 SECRETS_FILE_PATH = os.path.join(APP_ROOT_DIR, "secrets.json")
 
 def load_secrets():
@@ -24,9 +23,9 @@ def load_secrets():
         with open(SECRETS_FILE_PATH, 'r', encoding='utf-8') as f:
             secrets = json.load(f)
 
-        required_keys = ["broker", "port", "username", "password"]
-        if not all(key in secrets for key in required_keys):
-            missing_keys = [key for key in required_keys if key not in secrets]
+        required_keys = ("broker", "port", "username", "password")
+        missing_keys = [key for key in required_keys if key not in secrets]
+        if missing_keys:
             print(f"CRITICAL: Secrets file {SECRETS_FILE_PATH} is missing required keys: {', '.join(missing_keys)}")
             sys.exit(1)
 
@@ -50,6 +49,20 @@ password = secrets["password"]
 
 client_id = "python_device_simulator"
 topic_prefix = f"{username}/"
+_pfx_len = len(topic_prefix)  # Все подписки начинаются с topic_prefix, поэтому он отрезается срезом
+
+# Минимальное изменение числового значения, при котором топик публикуется повторно
+PUBLISH_EPSILON = 1e-3
+# Период цикла симуляции и публикации, секунды
+TICK_INTERVAL_SECONDS = 10.0
+# Раз в столько циклов публикуются все топики, чтобы новые подписчики получили полное состояние
+FULL_PUBLISH_EVERY_N_TICKS = 6
+# Редко меняющиеся параметры: публикуются с retain только при подключении и после изменения,
+# брокер сам отдает последнее значение новым подписчикам
+RETAINED_KEYS = ("term_c_max", "term_c_min", "otbor_g_1", "otbor_t")
+# Температуры публикуются каждый цикл, даже без изменения: клиент строит по ним графики
+# и сопоставляет последние N измерений куба и царги в сигнале стабильности
+ALWAYS_PUBLISHED_KEYS = ("term_k", "term_c", "term_d")
 
 
 # Начальные значения параметров устройства
@@ -88,221 +101,380 @@ device_state = {
     "work": WorkState.STOP.value
 }
 
+# Полные имена топиков параметров, чтобы не склеивать строки при каждой публикации
+STATE_TOPICS = {key: topic_prefix + key for key in device_state}
+# Периодически публикуемые параметры: (ключ, топик, публиковать ли без изменения).
+# Внутреннее состояние 'work' и RETAINED_KEYS не входят
+PUBLISH_PLAN = [(key, STATE_TOPICS[key], key in ALWAYS_PUBLISHED_KEYS) for key in device_state
+                if key != "work" and key not in RETAINED_KEYS]
+
+
+# Коды режимов работы, используемые в симуляции
+MODE_STOP = WorkState.STOP.value
+MODE_RAZGON = WorkState.RAZGON.value
+MODE_OTBOR_VYKLUCHEN = WorkState.OTBOR_VYKLUCHEN.value
+MODE_OTBOR_TELA = WorkState.OTBOR_TELA.value
+MODE_OTBOR_GOLOV_POKAPELNO = WorkState.OTBOR_GOLOV_POKAPELNO.value
+
+
+# Обработчики команд: (client, payload). payload - байты сообщения: int() и float() разбирают их без декодирования в str
+def _handle_work(client, payload):
+    try:
+        requested_work_mode = int(payload)
+        # Only process if the requested mode is different from the current mode
+        if device_state["work"] != requested_work_mode:
+            print(f"on_message: Получена команда ИЗМЕНИТЬ режим работы на: {requested_work_mode}")
+            device_state["work"] = requested_work_mode
+            # Sync flag_otb; the name for an unknown mode is only formatted when needed
+            mode_name = WORK_STATE_NAMES.get(requested_work_mode)
+            if mode_name is None:
+                mode_name = f"Unknown({requested_work_mode})"
+            device_state["flag_otb"] = mode_name
+            print(f"on_message: Режим работы изменен на: {device_state['work']}, Флаг отбора: '{device_state['flag_otb']}'")
+        else:
+            # Message received, but it matches the current state. Ignore it (or log for debugging).
+            # print(f"on_message: Режим работы уже {requested_work_mode}. Команда проигнорирована.")
+            pass # Do nothing if the mode is already set
+
+    except ValueError:
+        print(f"on_message: Некорректное значение для режима работы (work): {payload.decode(errors='replace')}")
+
+
+def _handle_term_k_r(client, payload):
+    try:
+        temp_stop_razgon = float(payload)
+        print(f"on_message: Получена команда (term_k_r) установить term_k_m на: {temp_stop_razgon}")
+        device_state["term_k_m"] = temp_stop_razgon
+        print(f"on_message: Параметр term_k_m обновлен на {device_state['term_k_m']}")
+        publish_acknowledgement(client, "term_k_m")
+    except ValueError:
+        print(f"on_message: Некорректное значение для term_k_r: {payload.decode(errors='replace')}")
+
+
+def _handle_new_value(base_topic, client, payload):
+    """Команда <base_topic>_new: установить новое значение параметра."""
+    try:
+        requested_value = float(payload)
+        # --- State Comparison Logic (Optional but good practice) ---
+        if device_state[base_topic] != requested_value:
+            print(f"on_message: Получена команда ИЗМЕНИТЬ {base_topic} на: {requested_value}")
+            device_state[base_topic] = requested_value
+            print(f"on_message: Параметр {base_topic} обновлен на {device_state[base_topic]}")
+        else:
+            # print(f"on_message: Параметр {base_topic} уже установлен на: {requested_value}.")
+            pass # The value is already set, it is only acknowledged below
+        publish_acknowledgement(client, base_topic)
+
+    except ValueError:
+        print(f"on_message: Некорректное значение для {base_topic}: {payload.decode(errors='replace')}")
+
+
+# Параметры, изменяемые командами <параметр>_new
+COMMANDABLE_TOPICS = [
+    "term_d_m", "press_c_m", "term_c_max", "term_c_min", "term_k_m",
+    "term_nasos", "power_m", "otbor", "time_stop", "otbor_minus",
+    "min_otb", "sek_otb", "otbor_g_1", "otbor_g_2", "otbor_t", "delta_t"
+]
+
+# Топик команды (без префикса) -> обработчик. Это же и список подписок
+COMMAND_HANDLERS = {
+    "work": _handle_work,
+    "term_k_r": _handle_term_k_r, # For setting razgon stop temp
+}
+for _topic in COMMANDABLE_TOPICS:
+    COMMAND_HANDLERS[f"{_topic}_new"] = functools.partial(_handle_new_value, _topic)
+
 
 # Функция при подключении к брокеру
-def on_connect(client, userdata, flags, rc):
-    print(f"on_connect: Подключено с кодом результата {rc}")
+def on_connect(client, userdata, flags, reason_code, properties):
+    print(f"on_connect: Подключено с кодом результата {reason_code}")
     
     # Подписываемся на топики для получения команд
-    client.subscribe(topic_prefix + "work")
-    client.subscribe(f"{topic_prefix}term_k_r") # For setting razgon stop temp
+    # QoS 1 (как и у публикаций клиента), чтобы брокер сохранял команды для постоянной сессии
+    for topic in COMMAND_HANDLERS:
+        client.subscribe(topic_prefix + topic, qos=1)
 
-    # Subscribe to all commandable topics (_new suffix)
-    commandable_topics = [
-        "term_d_m", "press_c_m", "term_c_max", "term_c_min", "term_k_m",
-        "term_nasos", "power_m", "otbor", "time_stop", "otbor_minus",
-        "min_otb", "sek_otb", "otbor_g_1", "otbor_g_2", "otbor_t", "delta_t"
-    ]
-    for topic in commandable_topics:
-        client.subscribe(f"{topic_prefix}{topic}_new")
+    for key in RETAINED_KEYS:
+        publish_retained(client, key)
 
 
 # Функция при получении сообщения
 def on_message(client, userdata, msg):
-    topic = msg.topic
-    payload = msg.payload.decode()
-    # print(f"on_message: Получено сообщение: {topic} = {payload}")
+    payload = msg.payload
+    # print(f"on_message: Получено сообщение: {msg.topic} = {payload.decode(errors='replace')}")
 
-    relative_topic = topic.replace(topic_prefix, "")
-    
-    # Обрабатываем команды
-    if relative_topic == "work":
-        try:
-            requested_work_mode = int(payload)
-            # Only process if the requested mode is different from the current mode
-            if device_state["work"] != requested_work_mode:
-                print(f"on_message: Получена команда ИЗМЕНИТЬ режим работы на: {requested_work_mode}")
-                device_state["work"] = requested_work_mode
-                device_state["flag_otb"] = WORK_STATE_NAMES.get(requested_work_mode, f"Unknown({requested_work_mode})") # Sync flag_otb
-                print(f"on_message: Режим работы изменен на: {device_state['work']}, Флаг отбора: '{device_state['flag_otb']}'")
-            else:
-                # Message received, but it matches the current state. Ignore it (or log for debugging).
-                # print(f"on_message: Режим работы уже {requested_work_mode}. Команда проигнорирована.")
-                pass # Do nothing if the mode is already set
-
-        except ValueError:
-            print(f"on_message: Некорректное значение для режима работы ({relative_topic}): {payload}")
-    
-    elif relative_topic == "term_k_r":
-        try:
-            temp_stop_razgon = float(payload)
-            print(f"on_message: Получена команда (term_k_r) установить term_k_m на: {temp_stop_razgon}")
-            device_state["term_k_m"] = temp_stop_razgon
-            print(f"on_message: Параметр term_k_m обновлен на {device_state['term_k_m']}")
-        except ValueError:
-            print(f"on_message: Некорректное значение для term_k_r: {payload}")
-    
-    elif relative_topic.endswith("_new"):
-        # Извлекаем базовый топик из имени с _new
-        base_topic = relative_topic.replace("_new", "")
-        
-        try:
-            # Обновляем соответствующее значение
-            if base_topic in device_state:
-                 requested_value = float(payload)
-                 # --- State Comparison Logic (Optional but good practice) ---
-                 if device_state[base_topic] != requested_value:
-                     print(f"on_message: Получена команда ИЗМЕНИТЬ {base_topic} на: {requested_value}")
-                     device_state[base_topic] = requested_value
-                     print(f"on_message: Параметр {base_topic} обновлен на {device_state[base_topic]}")
-                     # Optionally, immediately publish the updated status
-                     # client.publish(topic_prefix + base_topic, str(device_state[base_topic]))
-                 else:
-                     # print(f"on_message: Параметр {base_topic} уже установлен на: {requested_value}. Команда проигнорирована.")
-                     pass # Do nothing if the value is already set
-            else:
-                print(f"on_message: Неизвестный параметр для обновления: {base_topic}")
-
-        except ValueError:
-            print(f"on_message: Некорректное значение для {base_topic}: {payload}")
-    
-    else:
+    relative_topic = msg.topic[_pfx_len:]
+    handler = COMMAND_HANDLERS.get(relative_topic)
+    if handler is None:
         print(f"on_message: Неизвестная команда или необрабатываемый топик: {relative_topic}")
+        return
+    handler(client, payload)
+
+
+# --- Изменения температур за один цикл, по режимам работы ---
+# Функции выбираются по коду режима из таблиц ниже, вместо цепочек if/elif
+
+# random.uniform(a, b) is a + (b - a) * random(); the expanded form below saves a call per draw
+rand = random.random
+
+
+# Имитация изменения term_k (температура в кубе)
+def _term_k_change_razgon(tk):
+    return 2.0 + 3.0 * rand()  # Быстрый нагрев
+
+
+def _term_k_change_otbor(tk):
+    # Медленный нагрев, поддержание температуры или небольшой рост
+    if tk < 98: # Пока не достигли пика кипения
+        return 0.05 + 0.25 * rand()
+    return -0.05 + 0.1 * rand() # Стабилизация у пика
+
+
+def _term_k_change_stop(tk):
+    # Медленное остывание или стабильно
+    return -0.2 + 0.25 * rand()
+
+
+def _term_k_change_default(tk):
+    return -0.1 + 0.2 * rand()  # Небольшие колебания
+
+
+# Имитация изменения term_c (температура в царге)
+# term_c обычно следует за term_k, но ниже и может быть более стабильной при отборе.
+def _term_c_change_razgon(tk, tc, st):
+    # term_c растет, следуя за term_k, но обычно ниже
+    return (tk - tc) * 0.9
+
+
+def _term_c_change_otbor_golov(tk, tc, st):
+    # Стремится к стабилизации в районе температур отбора голов (например, 65-78°C)
+    # Это упрощенная модель; реально зависит от term_k.
+    if tk > 65:  # Только если куб достаточно нагрет
+        if tc < 70: # Условная нижняя граница для голов
+            return 0.1 + 0.3 * rand()
+        if tc > 78: # Условная верхняя граница для голов
+            return -0.3 + 0.2 * rand()
+        return -0.1 + 0.2 * rand()  # Колебания
+    # Медленно нагревается, если куб еще не горячий
+    if tk > tc + 1:
+        return 0.1 + 0.2 * rand()
+    return -0.05 + 0.1 * rand()
+
+
+def _term_c_change_otbor_tela(tk, tc, st):
+    # Должна колебаться в районе term_c_min / term_c_max, если куб достаточно нагрет
+    if tk > 78:  # Куб должен быть достаточно горячим для отбора тела
+        if tc < st["term_c_min"] - 0.2: # Если ниже term_c_min, может расти
+            return 0.05 + 0.15 * rand()
+        if tc > st["term_c_max"] + 0.2: # Если выше term_c_max, может "остывать"
+            return -0.2 + 0.15 * rand()
+        return -0.05 + 0.1 * rand() # В "рабочей зоне": очень стабильно / небольшой дрейф
+    # Если куб не достаточно горяч для тела, term_c может просто следовать общему нагреву
+    if tk > tc + 1:
+        return 0.1 + 0.2 * rand()
+    return -0.05 + 0.1 * rand()
+
+
+def _term_c_change_stop(tk, tc, st):
+    # Медленное остывание или стабильно, может медленно падать, если term_k падает
+    if tk < tc - 1 and tc > 18:
+        return -0.15 + 0.1 * rand()
+    return -0.1 + 0.15 * rand()
+
+
+def _term_c_change_default(tk, tc, st):
+    return -0.1 + 0.2 * rand()
+
+
+# Имитация изменения term_d (температура в дефлегматоре)
+# term_d обычно немного ниже term_c, так как дефлегматор охлаждает пар для создания флегмы.
+def _term_d_change_razgon(tc, td):
+    # term_d растет, следуя за term_c, но с небольшим отставанием
+    if tc > td:
+        return (tc - td) * 0.8
+    return -0.1 + 0.2 * rand() # Если вдруг обогнала, колеблется
+
+
+def _term_d_change_otbor(tc, td):
+    # При отборе дефлегматор активно поддерживает температуру для стабильного возврата флегмы.
+    # Она должна быть очень стабильной и чуть ниже царги.
+    target_d_temp = tc - (0.3 + 0.5 * rand()) # Цель - немного холоднее царги
+    # Медленно движется к цели: плавное приближение + колебания
+    return (target_d_temp - td) * 0.4
+
+
+def _term_d_change_stop(tc, td):
+    # Медленное остывание вместе с царгой
+    if tc < td - 0.5 and td > 18:
+        return -0.15 + 0.1 * rand()
+    return -0.1 + 0.15 * rand()
+
+
+def _term_d_change_default(tc, td):
+    return -0.1 + 0.2 * rand()
+
+
+TERM_K_CHANGES = {
+    MODE_RAZGON: _term_k_change_razgon,
+    MODE_OTBOR_TELA: _term_k_change_otbor,
+    MODE_OTBOR_GOLOV_POKAPELNO: _term_k_change_otbor,
+    MODE_STOP: _term_k_change_stop,
+    MODE_OTBOR_VYKLUCHEN: _term_k_change_stop,
+}
+TERM_C_CHANGES = {
+    MODE_RAZGON: _term_c_change_razgon,
+    MODE_OTBOR_GOLOV_POKAPELNO: _term_c_change_otbor_golov,
+    MODE_OTBOR_TELA: _term_c_change_otbor_tela,
+    MODE_STOP: _term_c_change_stop,
+    MODE_OTBOR_VYKLUCHEN: _term_c_change_stop,
+}
+TERM_D_CHANGES = {
+    MODE_RAZGON: _term_d_change_razgon,
+    MODE_OTBOR_GOLOV_POKAPELNO: _term_d_change_otbor,
+    MODE_OTBOR_TELA: _term_d_change_otbor,
+    MODE_STOP: _term_d_change_stop,
+    MODE_OTBOR_VYKLUCHEN: _term_d_change_stop,
+}
+# Доля стабилизируемой мощности по режимам (в остальных режимах нагрев выключен)
+POWER_FACTORS = {
+    MODE_RAZGON: 1.0,
+    MODE_OTBOR_TELA: 0.9,
+    MODE_OTBOR_GOLOV_POKAPELNO: 0.9,
+}
+# Параметр, задающий текущий ШИМ отбора, по режимам (в остальных режимах отбор закрыт)
+OTBOR_SOURCES = {
+    MODE_OTBOR_GOLOV_POKAPELNO: "otbor_g_1",
+    MODE_OTBOR_TELA: "otbor_t",
+}
 
 
 # Функция для имитации изменения параметров устройства
 def simulate_device_changes():
-    current_work_mode = device_state["work"]
+    st = device_state
+    current_work_mode = st["work"]
 
     # --- Simulate dynamic parameters based on work mode ---
     
     # Simulate power
-    if current_work_mode == WorkState.RAZGON.value:
-        device_state["power"] = device_state["power_m"] + random.uniform(-50, 50)
-    elif current_work_mode == WorkState.OTBOR_TELA.value or current_work_mode == WorkState.OTBOR_GOLOV_POKAPELNO.value:
-        device_state["power"] = device_state["power_m"] * 0.9 + random.uniform(-50, 50)
+    power_factor = POWER_FACTORS.get(current_work_mode)
+    if power_factor is not None:
+        power = st["power_m"] * power_factor + (-50 + 100 * rand())
     else:  # STOP, etc.
-        device_state["power"] = 0.0
-    device_state["power"] = max(0, device_state["power"])
+        power = 0.0
+    st["power"] = max(0, power)
     
     # Simulate atmospheric pressure
-    device_state["press_a"] += random.uniform(-0.1, 0.1)
+    st["press_a"] += -0.1 + 0.2 * rand()
 
     # Update 'otbor' based on current work mode
-    if current_work_mode == WorkState.OTBOR_GOLOV_POKAPELNO.value:
-        device_state["otbor"] = device_state["otbor_g_1"]
-    elif current_work_mode == WorkState.OTBOR_TELA.value:
-        device_state["otbor"] = device_state["otbor_t"]
-    else:
-        device_state["otbor"] = 0
-
-    # --- Existing simulation logic for temperatures ---
-    
-    # Имитация изменения term_k (температура в кубе)
-    if current_work_mode == WorkState.RAZGON.value:
-        term_k_change = random.uniform(2.0, 5.0)  # Быстрый нагрев
-    elif current_work_mode == WorkState.OTBOR_TELA.value or current_work_mode == WorkState.OTBOR_GOLOV_POKAPELNO.value:
-        # Медленный нагрев, поддержание температуры или небольшой рост
-        if device_state["term_k"] < 98: # Пока не достигли пика кипения
-            term_k_change = random.uniform(0.05, 0.3)
-        else:
-            term_k_change = random.uniform(-0.05, 0.05) # Стабилизация у пика
-    elif current_work_mode == WorkState.STOP.value or current_work_mode == WorkState.OTBOR_VYKLUCHEN.value:
-        # Медленное остывание или стабильно
-        term_k_change = random.uniform(-0.2, 0.05)
-    else:  # Другие режимы или по умолчанию
-        term_k_change = random.uniform(-0.1, 0.1)  # Небольшие колебания
-
-    device_state["term_k"] += term_k_change
+    otbor_source = OTBOR_SOURCES.get(current_work_mode)
+    st["otbor"] = st[otbor_source] if otbor_source is not None else 0
+
+    # --- Temperatures (computed in local variables, written back once) ---
+    tk = st["term_k"]
+    tc = st["term_c"]
+    td = st["term_d"]
+
+    tk += TERM_K_CHANGES.get(current_work_mode, _term_k_change_default)(tk)
     # Ограничиваем term_k разумными пределами
-    device_state["term_k"] = max(20.0, min(device_state["term_k"], 102.0)) # Мин. темп., макс. темп. кипения
-
-    # ============
-    # Имитация изменения term_c (температура в царге)
-    # term_c обычно следует за term_k, но ниже и может быть более стабильной при отборе.
-
-    if current_work_mode == WorkState.RAZGON.value:  # Разгон
-        # term_c растет, следуя за term_k, но обычно ниже
-        term_c_change = (device_state["term_k"] - device_state["term_c"]) * 0.9
-            
-    elif current_work_mode == WorkState.OTBOR_GOLOV_POKAPELNO.value:  # Отбор голов
-        # Стремится к стабилизации в районе температур отбора голов (например, 65-78°C)
-        # Это упрощенная модель; реально зависит от term_k.
-        if device_state["term_k"] > 65:  # Только если куб достаточно нагрет
-            if device_state["term_c"] < 70: # Условная нижняя граница для голов
-                term_c_change = random.uniform(0.1, 0.4)
-            elif device_state["term_c"] > 78: # Условная верхняя граница для голов
-                term_c_change = random.uniform(-0.3, -0.1)
-            else:
-                term_c_change = random.uniform(-0.1, 0.1)  # Колебания
-        else:
-            # Медленно нагревается, если куб еще не горячий
-            if device_state["term_k"] > device_state["term_c"] + 1:
-                 term_c_change = random.uniform(0.1, 0.3)
-            else:
-                 term_c_change = random.uniform(-0.05, 0.05)
-            
-    elif current_work_mode == WorkState.OTBOR_TELA.value:  # Отбор тела
-        # Должна колебаться в районе term_c_min / term_c_max, если куб достаточно нагрет
-        if device_state["term_k"] > 78:  # Куб должен быть достаточно горячим для отбора тела
-            if device_state["term_c"] < device_state["term_c_min"] - 0.2: # Если ниже term_c_min, может расти
-                term_c_change = random.uniform(0.05, 0.2)
-            elif device_state["term_c"] > device_state["term_c_max"] + 0.2: # Если выше term_c_max, может "остывать"
-                term_c_change = random.uniform(-0.2, -0.05)
-            else: # В "рабочей зоне" или приближается к границам
-                term_c_change = random.uniform(-0.05, 0.05) # Очень стабильно / небольшой дрейф
-        else:
-            # Если куб не достаточно горяч для тела, term_c может просто следовать общему нагреву
-            if device_state["term_k"] > device_state["term_c"] + 1:
-                term_c_change = random.uniform(0.1, 0.3)
-            else:
-                term_c_change = random.uniform(-0.05, 0.05)
-
-    elif current_work_mode == WorkState.STOP.value or current_work_mode == WorkState.OTBOR_VYKLUCHEN.value:
-        # Медленное остывание или стабильно, может медленно падать, если term_k падает
-        if device_state["term_k"] < device_state["term_c"] - 1 and device_state["term_c"] > 18:
-            term_c_change = random.uniform(-0.15, -0.05)
-        else:
-            term_c_change = random.uniform(-0.1, 0.05)
-    else:  # Другие режимы или по умолчанию
-        term_c_change = random.uniform(-0.1, 0.1)
-
-    device_state["term_c"] += term_c_change
-
-    # ============
-    # Имитация изменения term_d (температура в дефлегматоре)
-    # term_d обычно немного ниже term_c, так как дефлегматор охлаждает пар для создания флегмы.
-
-    if current_work_mode == WorkState.RAZGON.value:
-        # term_d растет, следуя за term_c, но с небольшим отставанием
-        if device_state["term_c"] > device_state["term_d"]:
-            term_d_change = (device_state["term_c"] - device_state["term_d"]) * 0.8
-        else: # Если вдруг обогнала, колеблется
-            term_d_change = random.uniform(-0.1, 0.1)
-
-    elif current_work_mode == WorkState.OTBOR_GOLOV_POKAPELNO.value or current_work_mode == WorkState.OTBOR_TELA.value:
-        # При отборе дефлегматор активно поддерживает температуру для стабильного возврата флегмы.
-        # Она должна быть очень стабильной и чуть ниже царги.
-        target_d_temp = device_state["term_c"] - random.uniform(0.3, 0.8) # Цель - немного холоднее царги
-        # Медленно движется к цели
-        diff = target_d_temp - device_state["term_d"]
-        term_d_change = diff * 0.4 # Плавное приближение + колебания
-
-    elif current_work_mode == WorkState.STOP.value or current_work_mode == WorkState.OTBOR_VYKLUCHEN.value:
-        # Медленное остывание вместе с царгой
-        if device_state["term_c"] < device_state["term_d"] - 0.5 and device_state["term_d"] > 18:
-            term_d_change = random.uniform(-0.15, -0.05)
-        else:
-            term_d_change = random.uniform(-0.1, 0.05)
-            
-    else: # Другие режимы
-        term_d_change = random.uniform(-0.1, 0.1)
+    if tk < 20.0: # Мин. темп.
+        tk = 20.0
+    elif tk > 102.0: # Макс. темп. кипения
+        tk = 102.0
+
+    tc += TERM_C_CHANGES.get(current_work_mode, _term_c_change_default)(tk, tc, st)
+
+    td += TERM_D_CHANGES.get(current_work_mode, _term_d_change_default)(tc, td)
+
+    st["term_k"] = tk
+    st["term_c"] = tc
+    st["term_d"] = td
+
+
+# Последние опубликованные значения, для публикации только изменившихся топиков
+last_published = {}
+# Закодированные payload'ы: ключ -> (значение, bytes)
+payload_cache = {}
+
 
-    device_state["term_d"] += term_d_change
+def value_changed(key, value):
+    """Checks whether the value differs from the last published one (numbers - beyond PUBLISH_EPSILON)."""
+    if key not in last_published:
+        return True
+    old_value = last_published[key]
+    if isinstance(value, (int, float)) and isinstance(old_value, (int, float)):
+        return abs(value - old_value) > PUBLISH_EPSILON
+    return value != old_value
+
+
+def encode_payload(key, value):
+    """Returns the payload bytes for the value, reusing the cached ones while the value is unchanged."""
+    cached = payload_cache.get(key)
+    if cached is not None and type(cached[0]) is type(value) and cached[0] == value:
+        return cached[1]
+    payload = str(value).encode()
+    payload_cache[key] = (value, payload)
+    return payload
+
+
+def publish_retained(client, key):
+    """Publishes a slow parameter as a retained message (it is excluded from the periodic publishing)."""
+    client.publish(STATE_TOPICS[key], encode_payload(key, device_state[key]), retain=True)
+
+
+def clear_retained(client, timeout=5.0):
+    """
+    Removes the retained RETAINED_KEYS messages from the broker (an empty retained payload deletes them),
+    so that after the emulator stops, clients do not get its values as the state of the real device.
+    """
+    infos = [client.publish(STATE_TOPICS[key], b"", qos=1, retain=True) for key in RETAINED_KEYS]
+    deadline = time.monotonic() + timeout
+    try:
+        for info in infos:
+            info.wait_for_publish(max(0.0, deadline - time.monotonic()))
+    except (RuntimeError, ValueError) as e: # Соединение пропало во время остановки
+        print(f"Не удалось удалить retained-значения: {e}")
+
+
+def publish_acknowledgement(client, key):
+    """
+    Publishes a parameter set by a command right away, also when the value did not change:
+    the client may wait for it (e.g. term_k_m after term_k_r), and an unchanged value would
+    otherwise only be sent with the next full publish.
+    """
+    if key in RETAINED_KEYS:
+        publish_retained(client, key)
+        return
+    value = device_state[key]
+    client.publish(STATE_TOPICS[key], encode_payload(key, value))
+    last_published[key] = value
+
+
+# Функция для публикации текущего состояния устройства
+def publish_device_state(full=False):
+    """
+    Publishes the status topics.
+    Only the values changed since the last publish are sent, unless `full` is set.
+    ALWAYS_PUBLISHED_KEYS are sent every time.
+    RETAINED_KEYS are never sent here, see publish_retained().
+    All the payloads are formatted first, then published with one client.publish() call per topic as before.
+    """
+    batch = []
+    changed = {}
+    for key, topic, always in PUBLISH_PLAN:
+        value = device_state[key]
+        if full or always or value_changed(key, value):
+            changed[key] = value
+            batch.append((topic, encode_payload(key, value)))
+    for topic_to_publish, payload in batch:
+        client.publish(topic_to_publish, payload)
+    last_published.update(changed)
 
 
 # Создаем клиент
-client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION1, client_id)
+# Постоянная сессия: брокер хранит подписки между перезапусками симулятора
+# и доставляет команды, отправленные, пока он был отключен
+client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id, clean_session=False)
 client.username_pw_set(username, password)
 client.on_connect = on_connect
 client.on_message = on_message
@@ -316,31 +488,35 @@ client.loop_start()
 try:
     print("Симулятор устройства запущен. Нажмите Ctrl+C для остановки.")
     
+    tick = 0
+    next_tick_time = time.monotonic()
     while True:
         # Имитируем изменения в устройстве
         simulate_device_changes()
         
-        # Публикуем текущие значения (статус)
-        current_time = datetime.now().strftime('%H:%M:%S')
-        # Optional: Reduce noise by printing publish summary less often or conditionally
-        # print(f"[{current_time}] Публикация данных:") 
-        for key, value in device_state.items():
-            if key == "work":
-                continue # Do not publish internal 'work' state
-            topic_to_publish = topic_prefix + key # Status topics remain the same
-            client.publish(topic_to_publish, str(value))
-            # Optional: Add print statement to see what's being published
-            # print(f"  -> {topic_to_publish}: {value}")
-
-        # Ждем 10 секунд перед следующей публикацией
-        time.sleep(10)
+        # Публикуем текущие значения (статус), если есть подключение: иначе paho только копил бы их в очереди
+        if client.is_connected():
+            # Optional: Reduce noise by printing publish summary less often or conditionally
+            # print(f"[{time.strftime('%H:%M:%S')}] Публикация данных:")
+            publish_device_state(full=(tick % FULL_PUBLISH_EVERY_N_TICKS == 0))
+            tick += 1
+
+        # Ждем до следующего цикла по расписанию, так что время работы цикла не накапливает сдвиг
+        next_tick_time += TICK_INTERVAL_SECONDS
+        delay = next_tick_time - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            next_tick_time = time.monotonic() # Отстали (например, после сна системы): пропущенные циклы не догоняем
 
 except KeyboardInterrupt:
     print("Симулятор остановлен")
 
 finally:
-    # Останавливаем цикл и отключаемся
-    client.loop_stop()
+    # Удаляем retained-значения симулятора, пока сетевой цикл еще работает, затем отключаемся
+    if client.is_connected():
+        clear_retained(client)
     client.disconnect()
+    client.loop_stop()
 
 
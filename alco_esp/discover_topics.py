@@ -3,7 +3,7 @@ import signal
 import json
 import paho.mqtt.client as mqtt
 import os
-import time
+import threading
 
 # --- Configuration ---
 # Path to the directory of the script
@@ -17,7 +17,10 @@ def load_secrets_cli():
     Loads secrets from secrets.json.
     On error, it prints to stderr and exits.
     """
-    if not os.path.exists(SECRETS_FILE_PATH):
+    try:
+        with open(SECRETS_FILE_PATH, 'r', encoding='utf-8') as f:
+            secrets = json.load(f)
+    except FileNotFoundError:
         template_path = os.path.join(APP_ROOT_DIR, "secrets_template.json")
         msg = f"ERROR: Secrets file not found: {SECRETS_FILE_PATH}\n"
         if os.path.exists(template_path):
@@ -26,21 +29,6 @@ def load_secrets_cli():
             msg += "Template 'secrets_template.json' is also missing. Cannot continue."
         print(msg, file=sys.stderr)
         sys.exit(1)
-
-    try:
-        with open(SECRETS_FILE_PATH, 'r', encoding='utf-8') as f:
-            secrets = json.load(f)
-
-        required_keys = ["broker", "port", "username", "password"]
-        if not all(key in secrets for key in required_keys):
-            missing_keys = [key for key in required_keys if key not in secrets]
-            msg = f"ERROR: The secrets file {SECRETS_FILE_PATH} is missing required keys: {', '.join(missing_keys)}"
-            print(msg, file=sys.stderr)
-            sys.exit(1)
-        
-        print("Successfully loaded secrets from secrets.json.")
-        return secrets
-
     except json.JSONDecodeError as e:
         msg = f"ERROR: Could not decode {SECRETS_FILE_PATH}. Is it valid JSON?\n{e}"
         print(msg, file=sys.stderr)
@@ -50,12 +38,22 @@ def load_secrets_cli():
         print(msg, file=sys.stderr)
         sys.exit(1)
 
+    required_keys = ("broker", "port", "username", "password")
+    missing_keys = [key for key in required_keys if key not in secrets]
+    if missing_keys:
+        msg = f"ERROR: The secrets file {SECRETS_FILE_PATH} is missing required keys: {', '.join(missing_keys)}"
+        print(msg, file=sys.stderr)
+        sys.exit(1)
+
+    print("Successfully loaded secrets from secrets.json.")
+    return secrets
+
 
 # --- MQTT Callbacks ---
-def on_connect(client, userdata, flags, rc):
+def on_connect(client, userdata, flags, reason_code, properties):
     """Callback for when the client connects to the broker."""
     secrets = userdata['secrets']
-    if rc == 0:
+    if not reason_code.is_failure:
         print(f"Successfully connected to MQTT broker: {secrets['broker']}")
         # Subscribe to the wildcard topic for the user
         wildcard_topic = f"{secrets['username']}/#"
@@ -63,16 +61,17 @@ def on_connect(client, userdata, flags, rc):
         print(f"Subscribed to wildcard topic: '{wildcard_topic}'")
         print("Waiting for messages... Press Ctrl+C to exit.")
     else:
-        print(f"Failed to connect, return code {rc}\n", file=sys.stderr)
-        if rc == 3:
+        print(f"Failed to connect: {reason_code} (code {reason_code.value})\n", file=sys.stderr)
+        # MQTT v3.1.1 CONNACK codes are reported as the MQTT v5 reason codes, so they are compared by name
+        if reason_code == "Server unavailable":
             print("Connection error: Server unavailable. Check broker address and port.", file=sys.stderr)
-        elif rc == 4:
+        elif reason_code == "Bad user name or password":
             print("Connection error: Bad username or password. Check your secrets.json file.", file=sys.stderr)
-        elif rc == 5:
+        elif reason_code == "Not authorized":
             print("Connection error: Not authorized. Check your credentials and ACLs on the broker.", file=sys.stderr)
         
         # Signal the main loop to exit on connection failure
-        userdata['connection_failed'] = True
+        userdata['stop_event'].set()
 
 def on_message(client, userdata, msg):
     """Callback for when a PUBLISH message is received from the server."""
@@ -82,10 +81,10 @@ def on_message(client, userdata, msg):
     except UnicodeDecodeError:
         print(f"  Topic: {msg.topic:<40} | Payload (raw): {msg.payload}")
 
-def on_disconnect(client, userdata, rc):
+def on_disconnect(client, userdata, disconnect_flags, reason_code, properties):
     """Callback for when the client disconnects."""
-    if rc != 0:
-        print(f"Unexpected disconnection from broker (rc={rc}).")
+    if reason_code.is_failure:
+        print(f"Unexpected disconnection from broker ({reason_code}).")
     else:
         print("Disconnected successfully.")
 
@@ -96,9 +95,10 @@ def main():
     print("--- Alco ESP MQTT Topic Discoverer ---")
     secrets = load_secrets_cli()
 
-    userdata = {'secrets': secrets, 'connection_failed': False}
+    stop_event = threading.Event()
+    userdata = {'secrets': secrets, 'stop_event': stop_event}
 
-    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION1, client_id=CLIENT_ID, userdata=userdata)
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=CLIENT_ID, userdata=userdata)
     client.username_pw_set(secrets["username"], secrets["password"])
     
     client.on_connect = on_connect
@@ -107,8 +107,7 @@ def main():
     
     def signal_handler(sig, frame):
         print("\nCtrl+C pressed. Disconnecting gracefully...")
-        client.disconnect()
-        # The loop will break on its own after disconnect
+        stop_event.set()
     
     signal.signal(signal.SIGINT, signal_handler)
 
@@ -122,8 +121,10 @@ def main():
     client.loop_start()
 
     try:
-        while not userdata['connection_failed']:
-            time.sleep(1)
+        # Returns as soon as the event is set. The timeout only lets the Ctrl+C handler run on Windows,
+        # where a blocking wait is not interrupted by signals
+        while not stop_event.wait(timeout=1):
+            pass
     except KeyboardInterrupt:
         print("\nKeyboardInterrupt caught. Shutting down.")
     
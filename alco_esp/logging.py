@@ -1,44 +1,159 @@
+import atexit
 import logging
 import os
+import queue
 import sys
-from logging.handlers import RotatingFileHandler
+import time
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 
 from alco_esp.constants import APP_ROOT_DIR, CSV_DATA_TOPIC_ORDER, CSV_DATA_HEADERS
 
+# Header lines of the CSV data logs
+DATA_CSV_HEADER = "Время;" + ";".join(CSV_DATA_HEADERS[topic] for topic in CSV_DATA_TOPIC_ORDER)
+ALL_DATA_CSV_HEADER = "Время;Топик;Значение"
+
 
 class CsvRotatingFileHandler(RotatingFileHandler):
     """
     A RotatingFileHandler that writes a header to new files.
+    The stream is flushed at most every `flush_interval` seconds instead of after every record,
+    so that the OS gets larger writes. The rest is written out by flush_pending() (see CsvQueueListener),
+    on rollover and on close.
+    The file is opened with a `buffer_size` bytes buffer, and its size is counted here for the rollover check,
+    because the base class seeks to the end of the stream for every record, which flushes the buffer.
     """
-    def __init__(self, filename, *args, header=None, **kwargs):
+    def __init__(self, filename, *args, header=None, flush_interval=2.0, buffer_size=64 * 1024, **kwargs):
         self.header = header
+        self._header_line = f"{header}\n" if header else ""
+        self.flush_interval = flush_interval
+        self.buffer_size = buffer_size
+        self._last_flush_time = time.monotonic()
+        self.has_pending = False # Records are written to the buffer but not flushed yet
+        self._file_size = 0  # In bytes, counted from the encoded records
+        self._is_regular_file = True
+        self._rollover_record_size = 0 # Size of the record that triggered the rollover, written right after it
         # We need to determine if the header needs to be written BEFORE the file is opened for appending.
         # The base class opens the file in its __init__.
         # So, we check for file existence and size here.
         write_header = not os.path.exists(filename) or os.path.getsize(filename) == 0
 
         super().__init__(filename, *args, **kwargs)
-
-        if write_header and self.header:
-            self.stream.write(self.header + '\n')
-            self.stream.flush()
+        # The utf-8-sig BOM is only written at the start of the file, not before every record
+        self._record_encoding = "utf-8" if self.encoding in (None, "utf-8-sig") else self.encoding
+        self._newline_extra_bytes = len(os.linesep) - 1 # The text stream writes '\n' as '\r\n' on Windows
+
+        if write_header:
+            self._write_header()
+
+    def _write_header(self):
+        """
+        Writes the header line to the (empty) file and flushes it.
+        It goes through the text stream, as the encoder also writes the utf-8-sig BOM on the first write.
+        """
+        if not self._header_line:
+            return
+        self.stream.write(self._header_line)
+        self.stream.flush()
+        self._file_size = self.stream.tell() # Includes the BOM
+
+    def _open(self):
+        stream = self._builtin_open(self.baseFilename, self.mode, buffering=self.buffer_size,
+                                    encoding=self.encoding, errors=self.errors)
+        self._file_size = stream.tell()  # Opened for appending, so this is the current file size
+        # See bpo-45401: never roll over anything other than regular files
+        self._is_regular_file = os.path.isfile(self.baseFilename)
+        return stream
+
+    def shouldRollover(self, record):
+        if self.stream is None:
+            self.stream = self._open()
+        if self.maxBytes <= 0 or not self._is_regular_file:
+            return False
+        msg = self.format(record) + self.terminator
+        msg_size = len(msg.encode(self._record_encoding, self.errors or "strict"))
+        if self._newline_extra_bytes:
+            msg_size += msg.count("\n") * self._newline_extra_bytes
+        if self._file_size + msg_size >= self.maxBytes:
+            self._rollover_record_size = msg_size
+            return True
+        self._file_size += msg_size
+        return False
+
+    def flush(self):
+        # Called by StreamHandler.emit() after every record
+        if time.monotonic() - self._last_flush_time >= self.flush_interval:
+            self.flush_pending()
+        else:
+            self.has_pending = True
+
+    def flush_pending(self):
+        """Writes out the buffered records regardless of the flush interval."""
+        self.has_pending = False
+        self._last_flush_time = time.monotonic()
+        super().flush()
 
     def doRollover(self):
         super().doRollover()
         # After rollover, the new file (self.baseFilename) is empty.
         # The stream has been reopened by the base class.
-        if self.header:
-            self.stream.write(self.header + '\n')
-            self.stream.flush()
+        self._write_header()
+        self._file_size += self._rollover_record_size
+        self._rollover_record_size = 0
+
+
+class CsvQueueListener(QueueListener):
+    """
+    A QueueListener for CsvRotatingFileHandler handlers. When no record arrives for the flush interval
+    of the handlers, their buffered records are written out, so that the last rows before a pause
+    in the data (e.g. a lost connection) do not wait in the buffer for the next record.
+    The flush runs on the listener thread, which is the one that writes the records anyway.
+    """
+    def dequeue(self, block):
+        if not block:
+            return super().dequeue(block)
+        timeout = min(handler.flush_interval for handler in self.handlers)
+        while True:
+            try:
+                return self.queue.get(timeout=timeout)
+            except queue.Empty:
+                for handler in self.handlers:
+                    if handler.has_pending:
+                        handler.flush_pending()
+
+
+# Listeners writing the CSV data logs in their own threads, see attach_via_queue()
+data_log_listeners = []
+
+
+def attach_via_queue(target_logger, handler):
+    """
+    Attaches the handler to the logger through a queue: the logging call only enqueues the record,
+    and the file is written by a CsvQueueListener thread, so the GUI thread never waits for disk I/O.
+    """
+    log_queue = queue.Queue()
+    target_logger.addHandler(QueueHandler(log_queue))
+    listener = CsvQueueListener(log_queue, handler)
+    listener.start()
+    data_log_listeners.append(listener)
+
+
+def stop_data_logging():
+    """Writes out the queued data log records, stops the listener threads and closes the files. Safe to call repeatedly."""
+    while data_log_listeners:
+        listener = data_log_listeners.pop()
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close() # Also writes out the lines not flushed yet
 
 
 def setup_data_logging():
     """Sets up a separate logger for CSV data."""
+    if main_data_logger.handlers: # Already set up, do not open the file a second time
+        return
     main_data_logger.setLevel(logging.INFO)
 
     log_dir = os.path.join(APP_ROOT_DIR, "log")
     log_file = os.path.join(log_dir, "alco_esp_data.csv")
-    csv_header = "Время;" + ";".join([CSV_DATA_HEADERS[topic] for topic in CSV_DATA_TOPIC_ORDER])
 
     # Use our custom handler to manage the header
     file_handler = CsvRotatingFileHandler(
@@ -47,14 +162,14 @@ def setup_data_logging():
         maxBytes=100 * 1024 * 1024,
         backupCount=5,
         encoding='utf-8-sig',
-        header=csv_header
+        header=DATA_CSV_HEADER
     )
 
     # Formatter that just passes the message through, as we format it ourselves.
     formatter = logging.Formatter('%(message)s')
     file_handler.setFormatter(formatter)
 
-    main_data_logger.addHandler(file_handler)
+    attach_via_queue(main_data_logger, file_handler)
 
     # Prevent data logs from propagating to the root logger (and thus the console)
     main_data_logger.propagate = False
@@ -63,11 +178,12 @@ def setup_data_logging():
 
 def setup_all_data_logging():
     """Sets up a separate logger for all incoming device data."""
+    if all_data_logger.handlers: # Already set up, do not open the file a second time
+        return
     all_data_logger.setLevel(logging.INFO)
 
     log_dir = os.path.join(APP_ROOT_DIR, "log")
     log_file = os.path.join(log_dir, "alco_esp_all_device_data.csv")
-    csv_header = "Время;Топик;Значение"
 
     file_handler = CsvRotatingFileHandler(
         log_file,
@@ -75,30 +191,31 @@ def setup_all_data_logging():
         maxBytes=100 * 1024 * 1024,
         backupCount=5,
         encoding='utf-8-sig',
-        header=csv_header
+        header=ALL_DATA_CSV_HEADER
     )
 
     formatter = logging.Formatter('%(message)s')
     file_handler.setFormatter(formatter)
-    all_data_logger.addHandler(file_handler)
+    attach_via_queue(all_data_logger, file_handler)
     all_data_logger.propagate = False
     logger.info("All data logging to all_device_data.csv setup complete.")
 
 
 def setup_logging():
+    if logger.handlers: # Already set up, do not duplicate every log line
+        return
     logger.setLevel(logging.DEBUG)  # Set the logging level for the logger
 
     # --- Define log directory and file path ---
     # Log directory is APP_ROOT_DIR/log
     log_dir = os.path.join(APP_ROOT_DIR, "log")
     log_dir_error = None
-    if not os.path.exists(log_dir):
-        try:
-            os.makedirs(log_dir)
-        except OSError as e:
-            log_dir_error = f"CRITICAL ERROR: Could not create log directory {log_dir}: {e}"
-            logger.error(log_dir_error)
-            log_dir = APP_ROOT_DIR
+    try:
+        os.makedirs(log_dir, exist_ok=True)
+    except OSError as e:
+        log_dir_error = f"CRITICAL ERROR: Could not create log directory {log_dir}: {e}"
+        logger.error(log_dir_error)
+        log_dir = APP_ROOT_DIR
 
     log_file = os.path.join(log_dir, "alco_esp_monitor.log")
     # Rotate log file when it reaches 100MB, keep 5 backup logs
@@ -131,3 +248,4 @@ main_data_logger = logging.getLogger("AlcoEspDataLogger")
 setup_data_logging()
 all_data_logger = logging.getLogger("AlcoEspAllDataLogger")
 setup_all_data_logging()
+atexit.register(stop_data_logging)
@@ -1,3 +1,8 @@
+import logging
+import queue
+import socket
+import time
+
 from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
 from paho.mqtt import client as mqtt
 
@@ -8,7 +13,6 @@ class MqttWorker(QObject):
     """
     Handles MQTT communication in a separate thread.
     """
-    messageReceived = pyqtSignal(str, str) # topic, payload
     connectionStatus = pyqtSignal(str)    # status message
     finished = pyqtSignal()               # Signal emitted when the worker is done
 
@@ -21,10 +25,14 @@ class MqttWorker(QObject):
         self.client_id = "python_qt_client_viewer"
         # self.topics_to_subscribe = topics_to_subscribe
         self.topic_prefix = f"{username}/"
+        self._prefix_len = len(self.topic_prefix)  # The only subscription is under topic_prefix, so it is sliced off
         self.client = None
+        # Received messages as (topic, payload, numeric value or None, receive POSIX time). Filled by Paho's network thread
+        # and drained in batches by the GUI thread instead of one queued signal per message.
+        self.message_queue = queue.SimpleQueue()
 
-    def on_connect(self, client, userdata, flags, rc):
-        if rc == 0:
+    def on_connect(self, client, userdata, flags, reason_code, properties):
+        if not reason_code.is_failure:
             log_msg = f"Подключено к MQTT брокеру: {self.broker}"
             logger.info(log_msg)
             self.connectionStatus.emit(log_msg)
@@ -37,21 +45,39 @@ class MqttWorker(QObject):
             logger.info(f"Subscribed to wildcard topic to receive all device data: {wildcard_topic}")
 
         else:
-            log_msg = f"Ошибка подключения, код {rc}"
+            log_msg = f"Ошибка подключения: {reason_code} (код {reason_code.value})"
             logger.error(log_msg)
             self.connectionStatus.emit(log_msg)
 
+    def on_connect_fail(self, client, userdata):
+        log_msg = f"Не удалось подключиться к MQTT брокеру {self.broker}. Повторная попытка..."
+        logger.warning(log_msg)
+        self.connectionStatus.emit(log_msg)
+
+    def on_socket_open(self, client, userdata, sock):
+        # Control commands are tiny packets: send them immediately instead of letting Nagle's algorithm hold them
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except (AttributeError, OSError) as e:
+            logger.warning(f"Could not set TCP_NODELAY on the MQTT socket: {e}")
+
     def on_message(self, client, userdata, msg):
-        topic = msg.topic.replace(self.topic_prefix, "")
-        payload = msg.payload.decode()
-        logger.debug(f"Received MQTT message: Topic='{topic}', Payload='{payload}'")
-        self.messageReceived.emit(topic, payload)
+        topic = msg.topic[self._prefix_len:]
+        payload = msg.payload.decode('utf-8', 'replace') # A broken payload must not raise in Paho's network thread
+        if logger.isEnabledFor(logging.DEBUG): # Do not format the message if it would be dropped anyway
+            logger.debug(f"Received MQTT message: Topic='{topic}', Payload='{payload}'")
+        # The payload is parsed here, so that the GUI thread only consumes ready numbers
+        try:
+            value = float(payload)
+        except ValueError:
+            value = None # Non-numeric payload, e.g. flag_otb
+        self.message_queue.put((topic, payload, value, time.time())) # Cheaper than datetime.now() in the network thread
 
-    def on_disconnect(self, client, userdata, rc):
-         log_msg = f"Отключено от MQTT брокера (rc={rc})"
+    def on_disconnect(self, client, userdata, disconnect_flags, reason_code, properties):
+         log_msg = f"Отключено от MQTT брокера ({reason_code})"
          logger.warning(log_msg) # Using warning for disconnect
          self.connectionStatus.emit(log_msg)
-         if rc != 0:
+         if reason_code.is_failure:
              # Paho's loop_start() handles reconnection attempts automatically.
              logger.warning("Unexpected disconnection. Paho-MQTT will attempt to reconnect.")
              self.connectionStatus.emit("Неожиданное отключение. Попытка переподключения...")
@@ -60,16 +86,20 @@ class MqttWorker(QObject):
         """
         Connects and starts the MQTT loop in the background.
         """
-        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION1, self.client_id)
+        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, self.client_id)
         self.client.username_pw_set(self.username, self.password)
         self.client.on_connect = self.on_connect
+        self.client.on_connect_fail = self.on_connect_fail
+        self.client.on_socket_open = self.on_socket_open
         self.client.on_message = self.on_message
         self.client.on_disconnect = self.on_disconnect
 
         try:
             self.connectionStatus.emit(f"Подключение к {self.broker}...")
             logger.info(f"MqttWorker: Attempting to connect to {self.broker}:{self.port}")
-            self.client.connect(self.broker, self.port, 60)
+            # The connection is established by Paho's network thread, so this thread is not blocked
+            # by DNS/TCP timeouts, and failed first connection attempts are retried like reconnects.
+            self.client.connect_async(self.broker, self.port, 60)
             self.client.loop_start() # Start network loop in background thread and return
             logger.info("MqttWorker: loop_start() called. Paho MQTT thread managing connection.")
             # The QThread's event loop will now run implicitly for this worker thread,
@@ -94,10 +124,11 @@ class MqttWorker(QObject):
             try:
                 # Add status update before publishing
                 self.connectionStatus.emit(f"Публикация: {topic_suffix} = {payload}")
-                logger.info(f"Attempting to publish: Topic='{full_topic}', Payload='{payload}'")
+                # %-style arguments: formatted by the logging module only if the record is actually emitted
+                logger.info("Attempting to publish: Topic='%s', Payload='%s'", full_topic, payload)
                 rc, mid = self.client.publish(full_topic, payload=payload, qos=1) # Use QoS 1 for reliability
                 if rc == mqtt.MQTT_ERR_SUCCESS:
-                    logger.info(f"Successfully published: Topic='{full_topic}', Payload='{payload}', MID={mid}")
+                    logger.info("Successfully published: Topic='%s', Payload='%s', MID=%s", full_topic, payload, mid)
                     # Add status update on success
                     self.connectionStatus.emit(f"Опубликовано: {topic_suffix} = {payload}")
                 else:
@@ -109,3 +140,9 @@ class MqttWorker(QObject):
         else:
             logger.warning("Cannot publish, MQTT client not connected.")
             self.connectionStatus.emit("Ошибка публикации: нет подключения")
+
+    @pyqtSlot(list)
+    def publish_batch(self, messages):
+        """Publishes a list of (topic suffix, payload) pairs in order, e.g. the parameters of one user action."""
+        for topic_suffix, payload in messages:
+            self.publish_message(topic_suffix, payload)
@@ -1,19 +1,22 @@
+import queue
 import signal
-import matplotlib.pyplot as plt
+import time
+import numpy as np
+import matplotlib.style as mplstyle
+from matplotlib.figure import Figure
 import matplotlib.dates as mdates
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QGridLayout, QSpacerItem, QSizePolicy, QComboBox, QScrollArea, QFrame)
-from PyQt5.QtCore import QThread, QTimer, pyqtSignal, pyqtSlot
+from PyQt5.QtCore import QEvent, QThread, QTimer, pyqtSignal, pyqtSlot
 from PyQt5.QtMultimedia import QSoundEffect
-from collections import deque
-from datetime import datetime, timedelta
 
 from alco_esp.constants import *
 from alco_esp.logging import *
 from alco_esp.settings import *
 from alco_esp.mqtt_utils import MqttWorker
 from alco_esp.child_dialogs import *
+from alco_esp.ring_buffer import RingBuffer
 
 
 # --- Alarm signal audio file path ---
@@ -23,6 +26,29 @@ ALARM_FILE_PATH = os.path.join(APP_ROOT_DIR, "alarm.wav")
 # --- Maximum MQTT connection delay. When it is exceeded, user is notified ---
 MQTT_DATA_TIMEOUT_SECONDS = 60.0
 
+# --- Interval of draining the received MQTT messages in the GUI thread ---
+MESSAGE_DRAIN_INTERVAL_MS = 100
+
+# --- Refresh intervals: signal checks are cheap and must react quickly,
+# the chart redraw is expensive and its period is set in the settings ("plot_refresh_seconds") ---
+SIGNAL_CHECK_INTERVAL_MS = 200
+STATUS_UPDATE_INTERVAL_MS = 100
+
+# --- Minimum interval between repeated CSV write error messages, so that a persistent failure does not flood the log ---
+CSV_ERROR_LOG_INTERVAL_SECONDS = 60
+
+# --- Signal label texts (%-style templates, formatted on every signal check) ---
+SIGNAL_TRIGGERED_TEMPLATE = "ВНИМАНИЕ: %s (%.1f°C) ≥ %.1f°C"
+SIGNAL_MONITORING_TEMPLATE = "Мониторинг (%s %.1f°C, порог %.1f°C)"
+SIGNAL_WAITING_TEMPLATE = "%s: Ожидание данных (порог %.1f°C)"
+SIGNAL_DISABLED_TEMPLATE = "%s: Мониторинг отключен"
+STABILITY_DISABLED_TEXT = "ΔT: Мониторинг отключен"
+STABILITY_WAITING_TEXT = "ΔT: Ожидание данных Tк..."
+STABILITY_COLD_TEMPLATE = "ΔT: Мониторинг (Tк=%.1f°C ≤ %.1f°C)"
+STABILITY_FEW_DATA_TEMPLATE = "ΔT: Мониторинг (Мало данных: %d пар за %sс)"
+STABILITY_TRIGGERED_TEMPLATE = "ВНИМАНИЕ: СТАБИЛЬНО: разброс ΔT (%.2f°C) ≤ %.2f°C за %sс (средняя ΔT=%.2f°C)"
+STABILITY_MONITORING_TEMPLATE = "ΔT: Мониторинг (Разброс=%.2f°C, порог %.2f°C, средняя ΔT=%.2f°C)"
+
 # --- Maximum number of temperature steps to store for plotting ---
 TEMPERATURE_DATA_WINDOW_SIZE = 10**6
 
@@ -36,10 +62,56 @@ control_topics = {
 }
 
 
+def minmax_downsample(values, n_bins):
+    """
+    Returns sorted indices of the points worth plotting: the minimum and the maximum of each of `n_bins`
+    consecutive chunks of `values` (so that short spikes stay visible), plus the first and the last point.
+    The chunks cover all the points, their sizes differ by at most one.
+    Arrays of at most 2 * n_bins points are returned whole.
+    """
+    n = len(values)
+    if n <= 2 * n_bins:
+        return np.arange(n)
+    edges = np.linspace(0, n, n_bins + 1).astype(np.intp)
+    starts, ends = edges[:-1], edges[1:]
+    # (n_bins, longest chunk) indices; the shorter chunks repeat their last point, which changes neither min nor max
+    chunk_indices = np.minimum(starts[:, None] + np.arange((ends - starts).max()), (ends - 1)[:, None])
+    chunks = values[chunk_indices]
+    rows = np.arange(n_bins)
+    indices = np.concatenate((
+        [0], chunk_indices[rows, chunks.argmin(axis=1)], chunk_indices[rows, chunks.argmax(axis=1)], [n - 1]))
+    return np.unique(indices)
+
+
+class SignalState:
+    """State of a one-shot signal with its label. The label is only touched when its text or style changes."""
+    def __init__(self, name_for_log):
+        self.name_for_log = name_for_log
+        self.monitoring_active = True
+        self.triggered = False
+        self.label = None # Attached in setup_controls
+        self._text = None
+        self._style_sheet = None
+
+    def show(self, text, style_sheet):
+        """Shows the text on the label with the style sheet (re-applying a style sheet re-polishes the widget)."""
+        if text != self._text:
+            self._text = text
+            self.label.setText(text)
+        if style_sheet != self._style_sheet:
+            # The style follows the signal state (inactive, monitoring, triggered), so state changes are logged here
+            # instead of logging every check of the signal timer
+            logger.debug(f"{self.name_for_log} signal: {text}")
+            self._style_sheet = style_sheet
+            self.label.setStyleSheet(style_sheet)
+
+
 # --- Main Application Window ---
 class AlcoEspMonitor(QMainWindow):
     # Add signal to request MQTT publication from the worker
     publishRequested = pyqtSignal(str, str)
+    # Several (topic, payload) messages of one user action, published in order with a single cross-thread call
+    publishBatchRequested = pyqtSignal(list)
 
     def __init__(self, secrets):
         super().__init__()
@@ -50,25 +122,31 @@ class AlcoEspMonitor(QMainWindow):
         # --- Initialize Settings ---
         self.settings = load_settings()
 
-        self.data = {key: deque(maxlen=TEMPERATURE_DATA_WINDOW_SIZE) for key in CHART_TEMPERATURE_TOPICS}
-        self.timestamps = {key: deque(maxlen=TEMPERATURE_DATA_WINDOW_SIZE) for key in CHART_TEMPERATURE_TOPICS}
+        # Temperature time series: rows of POSIX timestamps (seconds) and values, sharing one write position
+        self.series = {key: RingBuffer(TEMPERATURE_DATA_WINDOW_SIZE, width=2) for key in CHART_TEMPERATURE_TOPICS}
+        # Chart samples (values, timestamps) of the batch being drained, added to the ring buffers at once
+        self._pending_chart_samples = {key: ([], []) for key in CHART_TEMPERATURE_TOPICS}
+        # CSV lines of the batch being drained, written as one log record per file (see flush_csv_lines)
+        self._pending_all_data_lines = []
+        self._pending_main_data_lines = []
+        self._csv_error_logged_at = None # time.monotonic() of the last CSV write error message
+        # Cache of the formatted date and time for format_log_time()
+        self._log_time_second = None
+        self._log_time_prefix = ""
 
         # --- Storage for all device data ---
         self.all_latest_values = {}
         self.all_data_viewer_dialog = None
 
         # --- Initialize Signal States ---
-        self.t_kub_signal_monitoring_active = True
-        self.t_kub_signal_triggered = False
-
-        self.t_deflegmator_signal_monitoring_active = True
-        self.t_deflegmator_signal_triggered = False
-
-        self.stability_signal_monitoring_active = True
-        self.stability_signal_triggered = False
+        self.t_kub_signal = SignalState("T_kub")
+        self.t_deflegmator_signal = SignalState("T_deflegmator")
+        self.stability_signal = SignalState("Stability")
 
         # --- MQTT Data Tracking for Timeout ---
-        self.last_mqtt_message_time = None
+        self.last_mqtt_message_time = None # POSIX time, shown to the user
+        # time.monotonic() of the last message: the timeout is not affected by wall-clock adjustments
+        self.last_mqtt_message_monotonic = None
         self.mqtt_data_timeout_alarm_active = False  # Flag to track if "no data" alarm is shown
 
         self.pending_term_k_m_check = False
@@ -107,11 +185,20 @@ class AlcoEspMonitor(QMainWindow):
 
         self.status_label = QLabel("Подключение...")
         self.plot_layout.addWidget(self.status_label)
-
-        plt.style.use('seaborn-v0_8-darkgrid')
-        self.figure, self.ax = plt.subplots(1, 1, figsize=(10, 6)) # Single plot
+        # Bursts of status updates (e.g. publish + confirmation) are shown at most once per STATUS_UPDATE_INTERVAL_MS
+        self._pending_status = None
+        self._status_timer = QTimer()
+        self._status_timer.setSingleShot(True)
+        self._status_timer.setInterval(STATUS_UPDATE_INTERVAL_MS)
+        self._status_timer.timeout.connect(self._show_pending_status)
+
+        # The figure is created directly rather than via pyplot, which would also create
+        # and register its own canvas and window manager for it
+        mplstyle.use('seaborn-v0_8-darkgrid')
+        self.figure = Figure(figsize=(10, 6))
+        self.ax = self.figure.add_subplot(1, 1, 1) # Single plot
         self.canvas = FigureCanvas(self.figure)
-        self.toolbar = CustomNavigationToolbar(self.canvas, self, self.timestamps)
+        self.toolbar = CustomNavigationToolbar(self.canvas, self, self.series)
 
         self.plot_layout.addWidget(self.toolbar)
         self.plot_layout.addWidget(self.canvas, 1)
@@ -119,15 +206,31 @@ class AlcoEspMonitor(QMainWindow):
         self.setup_controls()
 
         self.lines = {}
+        # Axes background without the lines, captured after every full redraw for blitting
+        self._plot_background = None
+        self._plotted_state = None # Last timestamps per topic, x-limits and axes width at the last update_plots()
+        self._updating_plots = False # Set while update_plots() changes the view itself, see _on_xlim_changed()
+        self.canvas.mpl_connect('draw_event', self._on_canvas_draw)
+        self.canvas.mpl_connect('resize_event', self.adjust_plot_layout)
 
         self.configure_plots()
         self.setup_mqtt()
 
         self.plot_timer = QTimer()
-        self.plot_timer.setInterval(2000)
-        self.plot_timer.timeout.connect(self.update_plots_and_signals) # Combined update
+        self.plot_timer.setInterval(int(self.settings["plot_refresh_seconds"] * 1000))
+        self.plot_timer.timeout.connect(self.update_plot_views)
         self.plot_timer.start()
 
+        self.signal_timer = QTimer()
+        self.signal_timer.setInterval(SIGNAL_CHECK_INTERVAL_MS)
+        self.signal_timer.timeout.connect(self.update_signals)
+        self.signal_timer.start()
+
+        self.message_drain_timer = QTimer()
+        self.message_drain_timer.setInterval(MESSAGE_DRAIN_INTERVAL_MS)
+        self.message_drain_timer.timeout.connect(self.drain_messages)
+        self.message_drain_timer.start()
+
     def initialize_sound_and_alarm_system(self):
         """Initializes the sound effect and sets up status checking."""
         logger.info("Initializing sound and alarm system.")
@@ -354,9 +457,10 @@ class AlcoEspMonitor(QMainWindow):
         self.t_kub_signal_label.setAlignment(Qt.AlignCenter)
         self.t_kub_signal_label.setWordWrap(True)
         controls_grid_layout.addWidget(self.t_kub_signal_label, row, 0, 1, 6)
+        self.t_kub_signal.label = self.t_kub_signal_label
         row += 1
         self.reset_t_kub_signal_button = QPushButton("Сброс сигнала T куба")
-        self.reset_t_kub_signal_button.clicked.connect(lambda: self.reset_t_kub_signal())
+        self.reset_t_kub_signal_button.clicked.connect(self.reset_t_kub_signal)
         controls_grid_layout.addWidget(self.reset_t_kub_signal_button, row, 0, 1, 6)
         row += 1
 
@@ -365,9 +469,10 @@ class AlcoEspMonitor(QMainWindow):
         self.t_deflegmator_signal_label.setAlignment(Qt.AlignCenter)
         self.t_deflegmator_signal_label.setWordWrap(True)
         controls_grid_layout.addWidget(self.t_deflegmator_signal_label, row, 0, 1, 6)
+        self.t_deflegmator_signal.label = self.t_deflegmator_signal_label
         row += 1
         self.reset_t_deflegmator_signal_button = QPushButton("Сброс сигнала T дефлегматора")
-        self.reset_t_deflegmator_signal_button.clicked.connect(lambda: self.reset_t_deflegmator_signal())
+        self.reset_t_deflegmator_signal_button.clicked.connect(self.reset_t_deflegmator_signal)
         controls_grid_layout.addWidget(self.reset_t_deflegmator_signal_button, row, 0, 1, 6)
         row += 1
 
@@ -376,9 +481,10 @@ class AlcoEspMonitor(QMainWindow):
         self.stability_signal_label.setAlignment(Qt.AlignCenter)
         self.stability_signal_label.setWordWrap(True)
         controls_grid_layout.addWidget(self.stability_signal_label, row, 0, 1, 6)
+        self.stability_signal.label = self.stability_signal_label
         row += 1
         self.reset_stability_signal_button = QPushButton("Сброс сигнала ΔT")
-        self.reset_stability_signal_button.clicked.connect(lambda: self.reset_stability_signal())
+        self.reset_stability_signal_button.clicked.connect(self.reset_stability_signal)
         controls_grid_layout.addWidget(self.reset_stability_signal_button, row, 0, 1, 6)
         row += 1
         
@@ -448,12 +554,18 @@ class AlcoEspMonitor(QMainWindow):
                 logger.info(f"Stability settings changed. Resetting stability signal.")
                 self.reset_stability_signal(inform=False) # silent reset
 
+            if old_settings["plot_refresh_seconds"] != self.settings["plot_refresh_seconds"]:
+                logger.info("Plot refresh period changed.")
+                self.plot_timer.setInterval(int(self.settings["plot_refresh_seconds"] * 1000))
+
             chart_limits_changed = (old_settings["chart_y_min"] != self.settings["chart_y_min"] or
                                     old_settings["chart_y_max"] != self.settings["chart_y_max"])
             if chart_limits_changed:
                 logger.info("Chart Y-axis limits changed. Redrawing plot.")
-                # We can call update_plots_and_signals, which will handle it all
-                self.update_plots_and_signals()
+                self.ax.set_ylim(self.settings["chart_y_min"], self.settings["chart_y_max"])
+                self.adjust_plot_layout() # The Y tick labels may have changed their width
+                # Redraw right away instead of waiting for the next plot refresh
+                self.update_plot_views(force=True)
             else:
                 # If only signal settings changed, we still need to re-evaluate them.
                 self.check_signal_conditions()
@@ -472,6 +584,7 @@ class AlcoEspMonitor(QMainWindow):
     def publish_work_mode(self, mode_code):
         """Publishes the selected work mode."""
         try:
+            messages = []
             if mode_code == WorkState.RAZGON.value:
                 """
                 Из документации:
@@ -482,7 +595,7 @@ class AlcoEspMonitor(QMainWindow):
                 temp_stop_razgon = self.settings['temp_stop_razgon']
                 payload = f"{temp_stop_razgon:.1f}"
                 logger.info(f"Requesting to set term_k_r: {payload}")
-                self.publishRequested.emit("term_k_r", payload)
+                messages.append(("term_k_r", payload))
                 self.update_status(f"Запрос на установку term_k_r: {payload}°C для установки режима РАЗГОН.")
 
                 # Set a flag to check the next 'term_k_m' update for confirmation
@@ -497,7 +610,8 @@ class AlcoEspMonitor(QMainWindow):
 
             mode_name = WORK_STATE_NAMES.get(mode_code, str(mode_code))
             logger.info(f"Requesting to set work mode: {mode_name} ({mode_code})")
-            self.publishRequested.emit(control_topics["work"], str(mode_code))
+            messages.append((control_topics["work"], str(mode_code)))
+            self.publishBatchRequested.emit(messages)
             self.update_status(f"Запрос на установку режима: {mode_name} ({mode_code})")
 
         except Exception as e:
@@ -566,16 +680,60 @@ class AlcoEspMonitor(QMainWindow):
             "term_d": "T дефлегматор (term_d)",
         }
 
-        self.lines["term_d"], = self.ax.plot([], [], label=self.base_line_labels["term_d"], marker='.', linestyle='-', color='tab:green')
-        self.lines["term_c"], = self.ax.plot([], [], label=self.base_line_labels["term_c"], marker='.', linestyle='-', color='tab:blue')
-        self.lines["term_k"], = self.ax.plot([], [], label=self.base_line_labels["term_k"], marker='.', linestyle='-', color='tab:red')
+        self.lines["term_d"], = self.ax.plot([], [], label=self.base_line_labels["term_d"], marker='.', linestyle='-', color='tab:green', animated=True)
+        self.lines["term_c"], = self.ax.plot([], [], label=self.base_line_labels["term_c"], marker='.', linestyle='-', color='tab:blue', animated=True)
+        self.lines["term_k"], = self.ax.plot([], [], label=self.base_line_labels["term_k"], marker='.', linestyle='-', color='tab:red', animated=True)
         self.ax.legend(loc='upper left', fontsize='small')
 
-        self.ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M:%S'))
-        self.ax.xaxis.set_major_locator(mdates.AutoDateLocator(minticks=10, maxticks=10))
+        # Static time axis configuration, done once instead of on every plot update
+        self.ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M:%S', tz=LOCAL_TZ))
+        self.ax.xaxis.set_major_locator(mdates.AutoDateLocator(minticks=3, maxticks=7, tz=LOCAL_TZ)) # Fewer ticks
         self.ax.tick_params(axis='x', rotation=30)
+        # ax.clear() also drops the axes callbacks, so this is connected on every configuration
+        self.ax.callbacks.connect('xlim_changed', self._on_xlim_changed)
         
+        self.adjust_plot_layout()
+
+    def _on_xlim_changed(self, ax):
+        """
+        Re-slices the lines for a view set by the toolbar (pan, zoom, Home), so that the new view
+        is drawn with its data and not only with the samples of the previous one.
+        The toolbar redraws the canvas itself; the next update_plots() does a full update.
+        """
+        if self._updating_plots:
+            return
+        x_left, x_right = ax.get_xlim()
+        self._set_lines_data(x_left, x_right, max(1, int(ax.bbox.width)))
+        self._plotted_state = None
+        self._plot_background = None
+
+    def adjust_plot_layout(self, event=None):
+        """
+        Fits the axes with their labels into the figure. Expensive, so it is only done when the layout
+        can change (setup, canvas resize, chart limits change), not on plot updates.
+        """
         self.figure.tight_layout(rect=[0, 0.03, 1, 0.95])
+        self._plot_background = None # The axes moved, the next update must redraw them fully
+
+    def _on_canvas_draw(self, event):
+        """
+        Called after every full redraw of the canvas (resize, zoom, pan, view change).
+        Captures the background for blitting and draws the animated lines on top of it.
+        Not for the draws of figure.savefig() (toolbar "Save"): they render to another canvas,
+        and the saved image must not become the blitting background.
+        """
+        if event.canvas is not self.canvas or self.canvas.is_saving():
+            return
+        self._plot_background = self.canvas.copy_from_bbox(self.ax.bbox)
+        for line in self.lines.values():
+            self.ax.draw_artist(line)
+
+    def _blit_lines(self):
+        """Redraws only the temperature lines over the cached background."""
+        self.canvas.restore_region(self._plot_background)
+        for line in self.lines.values():
+            self.ax.draw_artist(line)
+        self.canvas.blit(self.ax.bbox)
 
     def setup_mqtt(self):
         """Creates and starts the MQTT worker thread."""
@@ -587,14 +745,16 @@ class AlcoEspMonitor(QMainWindow):
             self.secrets["password"]
         )
         self.mqtt_worker.moveToThread(self.mqtt_thread)
+        self.message_queue = self.mqtt_worker.message_queue
 
         # Connect signals and slots
         self.mqtt_thread.started.connect(self.mqtt_worker.run)
-        self.mqtt_worker.messageReceived.connect(self.handle_message)
         self.mqtt_worker.connectionStatus.connect(self.update_status)
-        # Connect the main window's publish request signal to the worker's slot
-        # Note: This connection happens across threads, Qt handles it.
-        self.publishRequested.connect(self.mqtt_worker.publish_message)
+        # Connect the main window's publish request signals to the worker's slots.
+        # The worker lives in the MQTT thread, so the calls are queued to its event loop
+        # (explicit, so that publishing never runs in the GUI thread).
+        self.publishRequested.connect(self.mqtt_worker.publish_message, Qt.QueuedConnection)
+        self.publishBatchRequested.connect(self.mqtt_worker.publish_batch, Qt.QueuedConnection)
 
         # Ensure thread quits when finished or window closes
         self.mqtt_worker.finished.connect(self.mqtt_thread.quit)
@@ -605,19 +765,74 @@ class AlcoEspMonitor(QMainWindow):
 
     @pyqtSlot(str)
     def update_status(self, message):
-        """Updates the status bar label."""
+        """Updates the status bar label (debounced, every message is still logged)."""
         logger.info(f"Status update: {message}") # Log status messages
-        self.status_label.setText(message)
-
-    @pyqtSlot(str, str)
-    def handle_message(self, topic, payload_str):
-        """Processes incoming MQTT messages."""
-        current_time = datetime.now()
-        self.last_mqtt_message_time = current_time
-        time_str = current_time.strftime('%Y-%m-%d %H:%M:%S') + '.' + str(current_time.microsecond // 1000).zfill(3)
+        self._pending_status = message
+        if not self._status_timer.isActive():
+            self._status_timer.start()
+
+    def _show_pending_status(self):
+        """Shows the latest status message received within the debounce interval."""
+        self.status_label.setText(self._pending_status)
+
+    def drain_messages(self):
+        """Processes all MQTT messages received since the previous call."""
+        message_queue = self.message_queue
+        received_time = None
+        while True:
+            try:
+                topic, payload_str, value, received_time = message_queue.get_nowait()
+            except queue.Empty:
+                break
+            self.handle_message(topic, payload_str, value, received_time)
+
+        if received_time is None:
+            return # Nothing received
+        self.flush_csv_lines()
+        self.last_mqtt_message_time = received_time
+        self.last_mqtt_message_monotonic = time.monotonic()
         if self.mqtt_data_timeout_alarm_active: # If "no data" alarm was active, reset its flag
             self.mqtt_data_timeout_alarm_active = False
 
+        for topic, (values, times) in self._pending_chart_samples.items():
+            if values:
+                self.series[topic].extend(times, values)
+                values.clear()
+                times.clear()
+
+    def flush_csv_lines(self):
+        """Writes the collected CSV lines, one log record (and so one file write) per CSV file."""
+        for data_logger, lines in ((all_data_logger, self._pending_all_data_lines),
+                                   (main_data_logger, self._pending_main_data_lines)):
+            if lines:
+                try:
+                    data_logger.info("\n".join(lines))
+                except Exception as e:
+                    now = time.monotonic()
+                    if (self._csv_error_logged_at is None
+                            or now - self._csv_error_logged_at >= CSV_ERROR_LOG_INTERVAL_SECONDS):
+                        self._csv_error_logged_at = now
+                        logger.error(f"Failed to write {len(lines)} lines to the CSV log {data_logger.name}: {e}")
+                lines.clear()
+
+    def format_log_time(self, timestamp):
+        """
+        Formats a POSIX timestamp as 'YYYY-mm-dd HH:MM:SS.mmm' for the CSV logs.
+        The date and time part is formatted once per second and reused for messages within it.
+        """
+        second = int(timestamp)
+        if second != self._log_time_second:
+            self._log_time_second = second
+            self._log_time_prefix = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(second))
+        return "%s.%03d" % (self._log_time_prefix, (timestamp - second) * 1000)
+
+    def handle_message(self, topic, payload_str, value, current_time):
+        """
+        Processes an incoming MQTT message received at current_time (POSIX seconds).
+        value is the payload parsed by the MQTT worker, or None if it is not a number.
+        """
+        time_str = self.format_log_time(current_time)
+
         # --- Store all data ---
         self.all_latest_values[topic] = payload_str
 
@@ -625,42 +840,28 @@ class AlcoEspMonitor(QMainWindow):
         if self.pending_term_k_m_check and topic == "term_k_m":
             self.check_term_k_m_confirmation(payload_str)
 
-        # --- CSV Logging for all the device data  ---
-        try:
-            try:
-                # Format numeric values in scientific notation for locale-independent import
-                payload_to_log = f"{float(payload_str):.6e}"
-            except (ValueError, TypeError):
-                payload_to_log = payload_str
-            all_data_logger.info(f"{time_str};{topic};{payload_to_log}")
-        except Exception as e:
-            logger.error(f"Failed to write to all_data.csv for topic {topic}: {e}", exc_info=True)
+        if value is not None:
+            # Format numeric values in scientific notation for locale-independent import
+            payload_to_log = f"{value:.6e}"
+        else:
+            payload_to_log = payload_str # Non-numeric payloads (e.g. flag_otb) are logged as is
+
+        # --- CSV Logging for all the device data (written by flush_csv_lines after the batch) ---
+        self._pending_all_data_lines.append(f"{time_str};{topic};{payload_to_log}")
 
         # --- CSV Logging specially for topics of main interest ---
         if topic in TOPICS_OF_MAIN_INTEREST:
-            try:
-                values = [''] * len(CSV_DATA_TOPIC_ORDER)
-                idx = CSV_DATA_TOPIC_ORDER.index(topic)
-
-                try:
-                    # Format numeric values in scientific notation for locale-independent import
-                    value_to_log = f"{float(payload_str):.6e}"
-                except (ValueError, TypeError):
-                    value_to_log = payload_str
-                
-                values[idx] = value_to_log
-                log_line = f"{time_str};" + ";".join(values)
-                main_data_logger.info(log_line)
-            except Exception as e:
-                logger.error(f"Failed to write data to CSV for topic {topic}: {e}", exc_info=True)
+            values = [''] * len(CSV_DATA_TOPIC_ORDER)
+            values[CSV_DATA_TOPIC_INDEX[topic]] = payload_to_log
+            self._pending_main_data_lines.append(f"{time_str};" + ";".join(values))
 
         # --- Process specific topics for plotting ---
         if topic in CHART_TEMPERATURE_TOPICS:
-            try:
-                value = float(payload_str)
-                self.data[topic].append(value)
-                self.timestamps[topic].append(current_time)
-            except ValueError:
+            if value is not None:
+                values, times = self._pending_chart_samples[topic]
+                values.append(value)
+                times.append(current_time)
+            else:
                 logger.error(f"Could not convert payload '{payload_str}' for topic '{topic}' to number.")
 
     def check_term_k_m_confirmation(self, received_value_str):
@@ -707,33 +908,49 @@ class AlcoEspMonitor(QMainWindow):
             self._term_k_m_check_timer = None
         self.pending_term_k_m_check = False
 
-    def update_plots_and_signals(self):
-        """Updates plots and checks signal conditions."""
-        self.update_plots()
-        self.update_text_displays()
-        self.check_signal_conditions()
-        self.check_mqtt_data_timeout() # Add check for MQTT data timeout
+    def update_plot_views(self, force=False):
+        """
+        Redraws the chart (if there is new data or `force` is set) and refreshes the all-data dialog.
+        The chart is not redrawn while the main window is minimized, the dialog is a separate window and stays live.
+        """
+        if not self.isMinimized():
+            self.update_plots(force)
         if self.all_data_viewer_dialog:
             self.all_data_viewer_dialog.update_data(self.all_latest_values)
 
-    def update_plots(self):
-        """Updates the Matplotlib plots with the latest data."""
-        logger.debug("Updating plots...")
-        # --- Update Temperature Data and legend ---
-        for key in ["term_c", "term_k", "term_d"]:
-            if key in self.lines:
-                if self.timestamps[key]:
-                    self.lines[key].set_data(list(self.timestamps[key]), list(self.data[key])) # Ensure lists
-                    self.lines[key].set_visible(True)
-                else:
-                    self.lines[key].set_data([], [])
-                    self.lines[key].set_visible(False)
-                
-                # Update the label for the legend
-                base_label = self.base_line_labels.get(key, key)
-                self.lines[key].set_label(base_label)
+    def update_signals(self):
+        """Updates text displays and checks signal conditions and the MQTT data timeout."""
+        now = time.time() # One clock reading for all the signal checks of this tick
+        self.update_text_displays()
+        self.check_signal_conditions(now)
+        self.check_mqtt_data_timeout()
 
-        self.ax.relim()
+    def changeEvent(self, event):
+        """Catches up the chart when the window is restored, its redraws are skipped while minimized."""
+        if event.type() == QEvent.WindowStateChange:
+            if event.oldState() & Qt.WindowMinimized and not self.isMinimized():
+                self.update_plot_views(force=True) # The settings may have changed meanwhile
+        super().changeEvent(event)
+
+    def update_plots(self, force=False):
+        """
+        Updates the Matplotlib plots with the latest data.
+        Each line gets only the samples of the visible time window, min-max downsampled to the axes width.
+        Does nothing if neither the data, nor the view, nor the axes width changed since the previous update,
+        unless `force` is set (e.g. after the chart settings changed). An empty chart is always updated to keep scrolling.
+        """
+        self._updating_plots = True
+        try:
+            self._update_plots(force)
+        finally:
+            self._updating_plots = False
+
+    def _update_plots(self, force):
+        """Body of update_plots(), run with the xlim_changed handling suppressed."""
+        # The last timestamps identify the buffer contents, also when a full ring buffer no longer grows
+        data_state = tuple(series.view()[0, -1] if len(series) else None for series in self.series.values())
+
+        old_view = (self.ax.get_xlim(), self.ax.get_ylim())
 
         # Only autoscale the x-axis if the user hasn't zoomed or panned.
         # User interaction with zoom/pan tools turns autoscaling off for that axis.
@@ -741,48 +958,85 @@ class AlcoEspMonitor(QMainWindow):
         # then take over again.
         if self.ax.get_autoscalex_on():
             logger.debug("Autoscalex is ON. Rescaling view.")
-            self.ax.autoscale_view(scalex=True, scaley=False) # autoscale X, but not Y
             self.ax.set_ylim(self.settings["chart_y_min"], self.settings["chart_y_max"]) # Ensure Y-axis is fixed during autoscroll
 
             # Adjust x-axis limits based on the actual time range present in the data
-            all_times = [t for topic_times in self.timestamps.values() for t in topic_times if topic_times] # Filter empty
-            if all_times:
-                min_time = min(all_times)
-                max_time = max(all_times)
-                # Add a small buffer to max_time if only one point, or if window is small
-                if min_time == max_time:
-                    max_time = max_time + timedelta(seconds=10) # Show a 10s window for single point
-                else:
-                    time_range = max_time - min_time
-                    max_time = max_time + time_range * 0.05
-                    min_time = min_time - time_range * 0.01
-                self.ax.set_xlim(min_time, max_time)
-                self.ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M:%S'))
-                self.ax.xaxis.set_major_locator(mdates.AutoDateLocator(minticks=3, maxticks=7)) # Fewer ticks
-                self.ax.tick_params(axis='x', rotation=30)
+            data_range = series_time_range(self.series)
+            if data_range:
+                min_time, max_time = data_range
+                left, right = self.ax.get_xlim()
+                # While all the data still fits into the current view (thanks to the margin on the right),
+                # the view is kept, so that the new points are only blitted instead of redrawing the axes
+                if not (left <= epoch_to_datenum(min_time) and epoch_to_datenum(max_time) <= right):
+                    # Add a small buffer to max_time if only one point, or if window is small
+                    if min_time == max_time:
+                        max_time = max_time + 10 # Show a 10s window for single point
+                    else:
+                        time_range = max_time - min_time
+                        max_time = max_time + time_range * 0.05
+                        min_time = min_time - time_range * 0.01
+                    self.ax.set_xlim(epoch_to_datenum(min_time), epoch_to_datenum(max_time))
             else: # No data yet, set a default view
-                now = datetime.now()
-                self.ax.set_xlim(now - timedelta(seconds=60), now)
+                now = time.time()
+                self.ax.set_xlim(epoch_to_datenum(now - 60), epoch_to_datenum(now))
 
             # set_xlim turns autoscale off, so we re-enable it to remember we are in auto mode.
             self.ax.set_autoscalex_on(True)
-        
+
         else:
             logger.debug("Autoscalex is OFF. Skipping view rescale.")
 
-        self.ax.legend(loc='upper left')
+        x_left, x_right = self.ax.get_xlim()
+        width_px = max(1, int(self.ax.bbox.width))
+        plot_state = (data_state, (x_left, x_right), width_px)
+        if not force and plot_state == self._plotted_state and any(t is not None for t in data_state):
+            logger.debug("No new data and the view is unchanged. Skipping plot update.")
+            return
+        self._plotted_state = plot_state
+
+        logger.debug("Updating plots...")
+        self._set_lines_data(x_left, x_right, width_px)
+        self.ax.relim()
 
         try:
-            self.figure.tight_layout(rect=[0, 0.03, 1, 0.95])
-            self.canvas.draw()
+            if self._plot_background is None or (self.ax.get_xlim(), self.ax.get_ylim()) != old_view:
+                # The view has changed, axes and ticks must be redrawn. The redraw is scheduled
+                # on the Qt event loop (coalescing with resize/toolbar redraws) instead of rendering
+                # here; until it happens there is no valid background to blit onto.
+                self._plot_background = None
+                self.canvas.draw_idle()
+            else:
+                self._blit_lines()
         except Exception as e:
-            logger.error(f"Error drawing canvas: {e}", exc_info=True)
+            logger.error(f"Error drawing canvas: {e}") # No traceback: this runs on every plot refresh
+
+    def _set_lines_data(self, x_left, x_right, width_px):
+        """
+        Sets the temperature lines to the samples of the x-range (Matplotlib date numbers),
+        min-max downsampled to `width_px` columns. Labels and legend are static, created in configure_plots.
+        """
+        t_left, t_right = datenum_to_epoch(x_left), datenum_to_epoch(x_right)
+        for key in ["term_c", "term_k", "term_d"]:
+            if key in self.lines:
+                n = len(self.series[key])
+                if n:
+                    timestamps, values = self.series[key].view()
+                    # The visible window plus one point on each side, so that the line reaches the axes edges
+                    lo = max(0, np.searchsorted(timestamps, t_left) - 1)
+                    hi = min(n, np.searchsorted(timestamps, t_right, side='right') + 1)
+                    # About two points per pixel column: more would not be visible anyway
+                    indices = lo + minmax_downsample(values[lo:hi], width_px)
+                    self.lines[key].set_data(epoch_to_datenum(timestamps[indices]), values[indices])
+                    self.lines[key].set_visible(True)
+                else:
+                    self.lines[key].set_data([], [])
+                    self.lines[key].set_visible(False)
 
     def update_text_displays(self):
         """Updates text labels with latest values."""
 
         if self.last_mqtt_message_time:
-            self.last_update_time_label.setText(f"Последнее сообщение от устройства: {self.last_mqtt_message_time.strftime('%H:%M:%S')}")
+            self.last_update_time_label.setText(f"Последнее сообщение от устройства: {time.strftime('%H:%M:%S', time.localtime(self.last_mqtt_message_time))}")
 
         term_d = self.all_latest_values.get("term_d")
         if term_d is not None:
@@ -861,17 +1115,16 @@ class AlcoEspMonitor(QMainWindow):
         else:
             self.term_k_m_label.setText("Остановка разгона при T куба: -")
 
-    def check_signal_conditions(self):
-        """Checks the conditions and updates the signal labels."""
-        logger.debug("Checking all signal conditions.")
+    def check_signal_conditions(self, now=None):
+        """Checks the conditions and updates the signal labels. `now` is the current POSIX time, if already known."""
         self.check_t_kub_signal()
         self.check_t_deflegmator_signal()
-        self.check_temperature_stability_signal()
+        self.check_temperature_stability_signal(now)
 
     def check_mqtt_data_timeout(self):
         """Checks if data has been received from MQTT recently."""
-        if self.last_mqtt_message_time: # Ensure it's initialized
-            time_since_last_message = (datetime.now() - self.last_mqtt_message_time).total_seconds()
+        if self.last_mqtt_message_monotonic is not None: # Ensure it's initialized
+            time_since_last_message = time.monotonic() - self.last_mqtt_message_monotonic
 
             if time_since_last_message > MQTT_DATA_TIMEOUT_SECONDS and \
                not self.mqtt_data_timeout_alarm_active:
@@ -921,9 +1174,7 @@ class AlcoEspMonitor(QMainWindow):
             self,
             topic_key,
             setting_key,
-            monitoring_active_attr,
-            triggered_attr,
-            label_attr,
+            signal_state,
             reset_func,
             name_for_log,
             name_for_ui,
@@ -931,54 +1182,42 @@ class AlcoEspMonitor(QMainWindow):
         ):
         temp_value = self.all_latest_values.get(topic_key)
         threshold = self.settings[setting_key]
-        monitoring_active = getattr(self, monitoring_active_attr)
-        label_widget = getattr(self, label_attr)
-        
-        logger.debug(f"Checking {name_for_log} signal: {topic_key}={temp_value}, threshold={threshold}, monitoring_active={monitoring_active}")
 
-        if monitoring_active:
-            logger.debug(f"{name_for_log} signal monitoring is active.")
+        if signal_state.monitoring_active:
             if temp_value is not None:
-                logger.debug(f"{topic_key} is {temp_value}.")
                 temp_value = float(temp_value)
                 if temp_value >= threshold:
                     logger.info(f"{name_for_log} signal TRIGGERED: {topic_key} ({temp_value}) >= threshold ({threshold})")
-                    setattr(self, triggered_attr, True)
-                    setattr(self, monitoring_active_attr, False)
-                    message = f"ВНИМАНИЕ: {name_for_ui} ({temp_value:.1f}°C) ≥ {threshold:.1f}°C"
+                    signal_state.triggered = True
+                    signal_state.monitoring_active = False
+                    message = SIGNAL_TRIGGERED_TEMPLATE % (name_for_ui, temp_value, threshold)
                     style_sheet = STYLE_ALARM_TRIGGERED
                     self.alarm_message_with_sound(message)
                 else:
-                    logger.debug(f"{name_for_log} signal: Monitoring, condition not met ({topic_key} {temp_value} < threshold {threshold}).")
-                    message = f"Мониторинг ({short_name_for_ui} {temp_value:.1f}°C, порог {threshold:.1f}°C)"
+                    message = SIGNAL_MONITORING_TEMPLATE % (short_name_for_ui, temp_value, threshold)
                     style_sheet = STYLE_MONITORING
             else:
-                logger.debug(f"{name_for_log} signal: Waiting for {topic_key} data.")
-                message = f"{name_for_ui}: Ожидание данных (порог {threshold:.1f}°C)"
+                message = SIGNAL_WAITING_TEMPLATE % (name_for_ui, threshold)
                 style_sheet = STYLE_MONITORING
         
         else: # Monitoring not active
             if temp_value is not None and float(temp_value) < threshold:
                 logger.info(f"{name_for_log} below threshold while monitoring off, resetting signal.")
-                reset_func() # This will re-evaluate and update the UI.
-                self.reset_stability_signal()
-                return # Exit to avoid overwriting the UI with stale data from this run.
+                reset_func(reevaluate=False)
+                self.reset_stability_signal(reevaluate=False)
+                return # The labels are updated by the next signal check, not with stale data from this run.
 
-            logger.debug(f"{name_for_log} signal monitoring is NOT active.")
-            message = f"{name_for_ui}: Мониторинг отключен"
+            message = SIGNAL_DISABLED_TEMPLATE % name_for_ui
             style_sheet = STYLE_INACTIVE
 
-        label_widget.setText(message)
-        label_widget.setStyleSheet(style_sheet)
+        signal_state.show(message, style_sheet)
 
     def check_t_kub_signal(self):
         """Checks the T kub signal condition and updates its label."""
         self._check_temperature_signal(
             topic_key="term_k",
             setting_key="t_signal_kub",
-            monitoring_active_attr="t_kub_signal_monitoring_active",
-            triggered_attr="t_kub_signal_triggered",
-            label_attr="t_kub_signal_label",
+            signal_state=self.t_kub_signal,
             reset_func=self.reset_t_kub_signal,
             name_for_log="T_kub",
             name_for_ui="T куба",
@@ -990,121 +1229,107 @@ class AlcoEspMonitor(QMainWindow):
         self._check_temperature_signal(
             topic_key="term_d",
             setting_key="t_signal_deflegmator",
-            monitoring_active_attr="t_deflegmator_signal_monitoring_active",
-            triggered_attr="t_deflegmator_signal_triggered",
-            label_attr="t_deflegmator_signal_label",
+            signal_state=self.t_deflegmator_signal,
             reset_func=self.reset_t_deflegmator_signal,
             name_for_log="T_deflegmator",
             name_for_ui="T дефлегматора",
             short_name_for_ui="T дефл.",
         )
 
-    def check_temperature_stability_signal(self):
+    def check_temperature_stability_signal(self, now=None):
         """
         Checks the temperature stability signal condition.
         The signal triggers if the variation of dT = term_k - term_c is within a threshold over the last `period_seconds`.
+        `now` is the current POSIX time, if already known.
         """
-        now = datetime.now()
+        if now is None:
+            now = time.time()
         term_k_str = self.all_latest_values.get("term_k")
         delta_t_threshold = self.settings["delta_t"]
         period_seconds_threshold = self.settings["period_seconds"]
         TERM_K_70 = 70.0
 
-        if not self.stability_signal_monitoring_active:
-            self.stability_signal_label.setText("ΔT: Мониторинг отключен")
-            self.stability_signal_label.setStyleSheet(STYLE_INACTIVE)
+        if not self.stability_signal.monitoring_active:
+            self.stability_signal.show(STABILITY_DISABLED_TEXT, STYLE_INACTIVE)
             return
 
         # Check T_kub threshold first
         try:
             term_k = float(term_k_str)
             if term_k <= TERM_K_70:
-                message = f"ΔT: Мониторинг (Tк={term_k:.1f}°C ≤ {TERM_K_70:.1f}°C)"
-                self.stability_signal_label.setText(message)
-                self.stability_signal_label.setStyleSheet(STYLE_MONITORING)
+                self.stability_signal.show(STABILITY_COLD_TEMPLATE % (term_k, TERM_K_70), STYLE_MONITORING)
                 return
         except (TypeError, ValueError): # Catches None or non-float string
-            message = "ΔT: Ожидание данных Tк..."
-            self.stability_signal_label.setText(message)
-            self.stability_signal_label.setStyleSheet(STYLE_MONITORING)
+            self.stability_signal.show(STABILITY_WAITING_TEXT, STYLE_MONITORING)
             return
 
         # --- Data fetching and filtering ---
-        start_time = now - timedelta(seconds=period_seconds_threshold)
-
-        def get_windowed_data(ts_deque, data_deque, start_time):
-            """Efficiently gets data points from within a time window from the end of a deque."""
-            # Iterate from the right (most recent) to find where the window starts
-            for i in range(len(ts_deque) - 1, -1, -1):
-                if ts_deque[i] < start_time:
-                    start_index = i + 1
-                    break
-            else: # If loop completes, all data is in window
-                start_index = 0
-            # Create a list only from the relevant slice of the deque
-            return [data_deque[i] for i in range(start_index, len(data_deque))]
-
-        k_data_window = get_windowed_data(self.timestamps['term_k'], self.data['term_k'], start_time)
-        c_data_window = get_windowed_data(self.timestamps['term_c'], self.data['term_c'], start_time)
+        start_time = now - period_seconds_threshold
+
+        # Timestamps are in receive order, so the window start is found by binary search (no mask over the buffer)
+        k_timestamps, k_values = self.series['term_k'].view()
+        c_timestamps, c_values = self.series['term_c'].view()
+        k_data_window = k_values[np.searchsorted(k_timestamps, start_time):]
+        c_data_window = c_values[np.searchsorted(c_timestamps, start_time):]
 
         # Per user instruction: "считать, что N последних измерений куба соответствуют N последним измерениям царги"
         num_pairs = min(len(k_data_window), len(c_data_window))
 
         if num_pairs < 2:
-            message = f"ΔT: Мониторинг (Мало данных: {num_pairs} пар за {period_seconds_threshold}с)"
-            self.stability_signal_label.setText(message)
-            self.stability_signal_label.setStyleSheet(STYLE_MONITORING)
+            message = STABILITY_FEW_DATA_TEMPLATE % (num_pairs, period_seconds_threshold)
+            self.stability_signal.show(message, STYLE_MONITORING)
             return
 
         # Pair up from the most recent data points.
         k_recent = k_data_window[-num_pairs:]
         c_recent = c_data_window[-num_pairs:]
         
-        dts_in_window = [k - c for k, c in zip(k_recent, c_recent)]
+        dts_in_window = k_recent - c_recent
 
-        variation = max(dts_in_window) - min(dts_in_window)
-        avg_dT = sum(dts_in_window) / len(dts_in_window)
+        variation = dts_in_window.max() - dts_in_window.min()
+        avg_dT = dts_in_window.mean()
 
         if variation <= delta_t_threshold:
             # Stability condition met! Trigger the alarm.
-            self.stability_signal_triggered = True
-            self.stability_signal_monitoring_active = False  # One-shot signal
+            self.stability_signal.triggered = True
+            self.stability_signal.monitoring_active = False  # One-shot signal
             
-            message = (f"ВНИМАНИЕ: СТАБИЛЬНО: разброс ΔT ({variation:.2f}°C) ≤ {delta_t_threshold:.2f}°C "
-                       f"за {period_seconds_threshold}с (средняя ΔT={avg_dT:.2f}°C)")
+            message = STABILITY_TRIGGERED_TEMPLATE % (variation, delta_t_threshold, period_seconds_threshold, avg_dT)
             style_sheet = STYLE_ALARM_TRIGGERED
             self.alarm_message_with_sound(message)
         else:
             # Condition not met: variation is too high
-            message = f"ΔT: Мониторинг (Разброс={variation:.2f}°C, порог {delta_t_threshold:.2f}°C, средняя ΔT={avg_dT:.2f}°C)"
+            message = STABILITY_MONITORING_TEMPLATE % (variation, delta_t_threshold, avg_dT)
             style_sheet = STYLE_MONITORING
         
-        self.stability_signal_label.setText(message)
-        self.stability_signal_label.setStyleSheet(style_sheet)
+        self.stability_signal.show(message, style_sheet)
 
-    def reset_t_kub_signal(self, inform=True):
-        self.t_kub_signal_monitoring_active = True
-        self.t_kub_signal_triggered = False
+    @pyqtSlot() # Called without the 'checked' argument of clicked(bool), so inform keeps its default
+    def reset_t_kub_signal(self, inform=True, reevaluate=True):
+        self.t_kub_signal.monitoring_active = True
+        self.t_kub_signal.triggered = False
         log_msg = "Сигнал T куба сброшен и активирован."
         logger.info(log_msg)
         if inform: self.update_status(log_msg)
-        self.check_signal_conditions() # Re-evaluate immediately
+        if reevaluate: self.check_t_kub_signal() # Re-evaluate immediately
 
-    def reset_t_deflegmator_signal(self, inform=True):
-        self.t_deflegmator_signal_monitoring_active = True
-        self.t_deflegmator_signal_triggered = False
+    @pyqtSlot()
+    def reset_t_deflegmator_signal(self, inform=True, reevaluate=True):
+        self.t_deflegmator_signal.monitoring_active = True
+        self.t_deflegmator_signal.triggered = False
         log_msg = "Сигнал T дефлегматора сброшен и активирован."
         logger.info(log_msg)
         if inform: self.update_status(log_msg)
-        self.check_signal_conditions() # Re-evaluate immediately
+        if reevaluate: self.check_t_deflegmator_signal() # Re-evaluate immediately
 
-    def reset_stability_signal(self, inform=True):
-        self.stability_signal_monitoring_active = True
-        self.stability_signal_triggered = False
+    @pyqtSlot()
+    def reset_stability_signal(self, inform=True, reevaluate=True):
+        self.stability_signal.monitoring_active = True
+        self.stability_signal.triggered = False
         log_msg = "Сигнал стабильности температур сброшен и активирован."
         logger.info(log_msg)
         if inform: self.update_status(log_msg)
-        self.check_signal_conditions() # Re-evaluate immediately
+        if reevaluate: self.check_temperature_stability_signal() # Re-evaluate immediately
 
     def perform_graceful_shutdown(self):
         """Handles the MQTT and thread cleanup."""
@@ -1128,6 +1353,9 @@ class AlcoEspMonitor(QMainWindow):
         else:
             logger.info("MQTT thread not running or already stopped.")
 
+        self.drain_messages() # Log the messages received since the last drain
+        stop_data_logging() # Write out the queued CSV records
+
     def closeEvent(self, event):
         """Ensure MQTT thread and Paho loop are stopped cleanly on window close."""
         logger.info("closeEvent triggered. Initiating shutdown.")
@@ -0,0 +1,73 @@
+import numpy as np
+
+
+class RingBuffer:
+    """
+    FIFO buffer of records of `width` floats (e.g. timestamp and value) backed by a numpy array,
+    holding at most `capacity` records. When full, the oldest records are overwritten.
+    Each field is stored as its own row (structure of arrays), so every field of view() is contiguous.
+    The storage starts small and grows by doubling up to `capacity`, so memory follows the amount of data.
+    Every record is written twice, at i and i + size, so that the stored records
+    are always a contiguous slice of the storage.
+    """
+    def __init__(self, capacity, width=1, initial_size=1024):
+        self.capacity = capacity
+        self.width = width
+        self._size = min(capacity, initial_size)  # Current number of slots, grows up to capacity
+        self._buf = np.empty((width, 2 * self._size), dtype=np.float64)
+        self._head = 0  # Index of the next write
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def _reserve(self, count):
+        """Grows the storage (by doubling, up to capacity) to hold `count` records."""
+        new_size = self._size
+        while new_size < count and new_size < self.capacity:
+            new_size = min(2 * new_size, self.capacity)
+        if new_size == self._size:
+            return
+        buf = np.empty((self.width, 2 * new_size), dtype=np.float64)
+        buf[:, :self._count] = self.view()
+        self._buf = buf
+        self._size = new_size
+        self._head = self._count
+
+    def append(self, *fields):
+        """Appends one record, given as `width` field values."""
+        if self._count == self._size:
+            self._reserve(self._count + 1)
+        self._buf[:, self._head] = fields
+        self._buf[:, self._head + self._size] = fields
+        self._head = (self._head + 1) % self._size
+        if self._count < self._size:
+            self._count += 1
+
+    def extend(self, *columns):
+        """Appends records given as `width` equally long sequences, with (at most two) slice assignments."""
+        columns = np.array(columns, dtype=np.float64).reshape(self.width, -1)[:, -self.capacity:]
+        n = columns.shape[1]
+        if n == 0:
+            return
+        if self._count + n > self._size:
+            self._reserve(self._count + n)
+        size = self._size
+        first = min(n, size - self._head)  # Part that fits before the end of the storage
+        self._buf[:, self._head:self._head + first] = columns[:, :first]
+        self._buf[:, self._head + size:self._head + size + first] = columns[:, :first]
+        rest = n - first
+        if rest:
+            self._buf[:, :rest] = columns[:, first:]
+            self._buf[:, size:size + rest] = columns[:, first:]
+        self._head = (self._head + n) % size
+        self._count = min(self._count + n, size)
+
+    def view(self):
+        """
+        Returns the stored records in chronological order as a (width, len) slice of the storage (no copy).
+        Unpacking it, e.g. `timestamps, values = buffer.view()`, gives a contiguous array per field.
+        """
+        if self._count < self._size:
+            return self._buf[:, :self._count]
+        return self._buf[:, self._head:self._head + self._size]
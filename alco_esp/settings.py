@@ -15,6 +15,7 @@ DEFAULT_PERIOD_SECONDS = 60 # seconds
 DEFAULT_TEMP_STOP_RAZGON = 70.0  # °C
 DEFAULT_CHART_Y_MIN = 10.0 # °C
 DEFAULT_CHART_Y_MAX = 110.0 # °C
+DEFAULT_PLOT_REFRESH_SECONDS = 2 # seconds
 TERM_K_M_CHECK_TIMEOUT = 20 # seconds
 
 SETTINGS_FILE_PATH = os.path.join(APP_ROOT_DIR, "settings.json")
@@ -39,7 +40,8 @@ def load_settings():
         "period_seconds": DEFAULT_PERIOD_SECONDS,
         "temp_stop_razgon": DEFAULT_TEMP_STOP_RAZGON,
         "chart_y_min": DEFAULT_CHART_Y_MIN,
-        "chart_y_max": DEFAULT_CHART_Y_MAX
+        "chart_y_max": DEFAULT_CHART_Y_MAX,
+        "plot_refresh_seconds": DEFAULT_PLOT_REFRESH_SECONDS
     }
 
     if not os.path.exists(SETTINGS_FILE_PATH):
@@ -147,6 +149,13 @@ class SettingsDialog(QDialog):
         self.chart_y_max_spinbox.setValue(current_settings.get("chart_y_max", DEFAULT_CHART_Y_MAX))
         layout.addRow("Пределы температур на графике, макс (°C):", self.chart_y_max_spinbox)
 
+        self.plot_refresh_spinbox = QDoubleSpinBox()
+        self.plot_refresh_spinbox.setRange(1.0, 60.0)  # Seconds
+        self.plot_refresh_spinbox.setDecimals(0)
+        self.plot_refresh_spinbox.setValue(
+            current_settings.get("plot_refresh_seconds", DEFAULT_PLOT_REFRESH_SECONDS))
+        layout.addRow("Период обновления графика (с):", self.plot_refresh_spinbox)
+
 
         self.buttons_layout = QHBoxLayout()
         self.ok_button = QPushButton("OK")
@@ -166,5 +175,6 @@ class SettingsDialog(QDialog):
             "period_seconds": int(self.period_spinbox.value()),
             "temp_stop_razgon": self.temp_stop_razgon_spinbox.value(),
             "chart_y_min": self.chart_y_min_spinbox.value(),
-            "chart_y_max": self.chart_y_max_spinbox.value()
+            "chart_y_max": self.chart_y_max_spinbox.value(),
+            "plot_refresh_seconds": int(self.plot_refresh_spinbox.value())
         }